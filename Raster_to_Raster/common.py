@@ -402,6 +402,10 @@ def save_image(img_node, image, img_format='PNG'):
                 img_format = image.format
             image.save(file=outstring)
         elif USE_PIL:
+            if hasattr(image, 'to_image'):
+                # 1 bit per pixel buffer (halftone_lib.bilevel), saved as a
+                # mode '1' image, i.e. a 1-bit PNG
+                image = image.to_image()
             image.save(outstring, img_format)
         else:
             raise RuntimeError(NO_MODULE)
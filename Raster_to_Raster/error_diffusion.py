@@ -20,26 +20,38 @@ import inkex
 import simplestyle
 import os
 import common
+from halftone_lib import channel_pool, kernels, wavefront
 
 
-def error_dispersion(image_index, size):
-   for y in range(0, size[1]-1):
-    for x in range(1, size[0]-1):
-      neighbour_index = image_index[x, y]
-      if(neighbour_index>127) :
-        image_index[x,y] = 255
-      else :
-        image_index[x,y] = 0
-      diffused_error = neighbour_index - image_index[x, y]
-      image_index[x+1, y] = int(image_index[x+1, y] + 7/16.0 * diffused_error)
-      image_index[x-1, y+1] = int(image_index[x-1, y+1] + 3/16.0 * diffused_error)
-      image_index[x,y+1] = int(image_index[x,   y+1] + 5/16.0 * diffused_error)
-      image_index[x+1, y+1] =int(image_index[x+1, y+1] + 1/16.0 * diffused_error)
+def error_dispersion(data, kernel, workers=1, report=None):
+    # diffuses the error of one channel array, one scanline at a time or as
+    # wavefronts over several worker processes
+    return wavefront.diffuse(data, kernel, workers, clamp=True, report=report)
 
 class error_diffusion(inkex.Effect):
 	def __init__(self):
 		inkex.Effect.__init__(self)
+		self.OptionParser.add_option("-k", "--kernel",
+						action="store", type="string",
+						dest="kernel", default="floyd-steinberg",
+						help="error diffusion kernel, one of: " + ", ".join(sorted(kernels.KERNELS)))
+		self.OptionParser.add_option("-w", "--workers",
+						action="store", type="int",
+						dest="workers", default=1,
+						help="number of worker processes for wavefront parallel diffusion, 0 for one per CPU core")
+		self.OptionParser.add_option("--report_speedup",
+						action="store", type="inkbool",
+						dest="report_speedup", default=False,
+						help="also run the serial engine and report the speedup of the parallel one")
+		self.OptionParser.add_option("--channel_workers",
+						action="store", type="int",
+						dest="channel_workers", default=0,
+						help="number of processes the CMYK channels are spread over, 0 for one per channel (up to the CPU core count)")
 	def effect(self):
+		kernel = kernels.get_kernel(self.options.kernel)
+		workers = self.options.workers or None
+		report = inkex.errormsg if self.options.report_speedup else None
+		channel_workers = self.options.channel_workers or None
 		image_node = None
 		for node in self.selected.values():
 			if(common.is_image(node)):
@@ -48,8 +60,9 @@ class error_diffusion(inkex.Effect):
 				image = common.prep_image(image_node)
 				image = image.convert('CMYK')
 				image = image.split()
-				for channel in image:
-					error_dispersion(channel.load(), channel.size)
+				image = channel_pool.map_channels(error_dispersion, image,
+						(kernel, workers, report), channel_workers)
+				image = [Image.fromarray(data) for data in image]
 				image = Image.merge("CMYK", image).convert("RGB")
 				common.save_image(image_node, image, img_format='PNG')
   
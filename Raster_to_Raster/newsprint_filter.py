@@ -14,63 +14,92 @@
     with this program; if not, write to the Free Software Foundation, Inc.,
     51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
     """
+import sys
+
 import numpy
-from PIL import Image, ImageDraw, ImageStat
+from PIL import Image, ImageDraw
 import inkex
 import simplestyle
 import os
 import common
+from halftone_lib import cells, channel_pool, separation
+from halftone_lib import sprites as dot_sprites
+
+def draw_dots(size, xs, ys, diameters, sample, scale, sprites=False):
+    '''Returns an 'L' image of the given size with a dot of each diameter
+        (pixels) drawn with its top left corner at xs, ys. With sprites the
+        dots are stamped from the anti-aliased discs of a DotAtlas, in a
+        few array operations, instead of being drawn one by one.'''
+    if sprites:
+        atlas = dot_sprites.get_atlas(sample*scale)
+        plane = atlas.stamp((size[1], size[0]), xs, ys, diameters)
+        return Image.fromarray(plane)
+    half_tone = Image.new('L', size)
+    draw = ImageDraw.Draw(half_tone)
+    for x_pos, y_pos, box_edge in zip(xs.tolist(), ys.tolist(), diameters.tolist()):
+        draw.ellipse((x_pos, y_pos, x_pos + box_edge, y_pos + box_edge), fill=255)
+    return half_tone
+
+def halftone_channel(channel, angle, im_size, sample, scale, sprites=False):
+    '''Returns the half-tone array of one separation (a 2-D uint8 array),
+        screened at angle degrees.'''
+    channel = Image.fromarray(channel).rotate(angle, expand=1)
+    size = channel.size[0]*scale, channel.size[1]*scale
+    # the cells are listed column by column, x outer and y inner
+    diameter = cells.dot_diameters(numpy.asarray(channel), sample).T
+    x = cells.cell_origins(channel.size[0], sample)[:, numpy.newaxis]
+    y = cells.cell_origins(channel.size[1], sample)[numpy.newaxis, :]
+    edge = 0.5*(1-diameter)
+    x_pos, y_pos = (x+edge)*scale, (y+edge)*scale
+    box_edge = sample*diameter*scale
+    x_pos, y_pos = numpy.broadcast_arrays(x_pos, y_pos)
+    half_tone = draw_dots(size, x_pos.ravel(), y_pos.ravel(), box_edge.ravel(),
+                          sample, scale, sprites)
+    half_tone = half_tone.rotate(-angle, expand=1)
+    width_half, height_half = half_tone.size
+    xx=(width_half-im_size[0]*scale) / 2
+    yy=(height_half-im_size[1]*scale) / 2
+    half_tone = half_tone.crop((xx, yy, xx + im_size[0]*scale, yy + im_size[1]*scale))
+    return numpy.asarray(half_tone)
+
+def lattice_channel(channel, angle, im_size, sample, scale, sprites=False):
+    '''Returns the half-tone array of one separation (a 2-D uint8 array),
+        screened at angle degrees. The dots are placed on a rotated lattice
+        in image coordinates and drawn straight onto the output, so the
+        separation is never rotated or resampled.'''
+    xs, ys = cells.rotated_lattice(im_size, sample, angle)
+    diameters = cells.lattice_diameters(channel, xs, ys, sample)
+    box_edge = sample*diameters*scale
+    half_tone = draw_dots((im_size[0]*scale, im_size[1]*scale), xs*scale - box_edge/2,
+                          ys*scale - box_edge/2, box_edge, sample, scale, sprites)
+    return numpy.asarray(half_tone)
+
+SCREENS = {'rotate': halftone_channel, 'lattice': lattice_channel}
 
-def gcr(im, percentage):
-    '''basic "Gray Component Replacement" function. Returns a CMYK image with
-        percentage gray component removed from the CMY channels and put in the
-        K channel, ie. for percentage=100, (41, 100, 255, 0) >> (0, 59, 214, 41)'''
-    cmyk_im = im.convert('CMYK')
-    if not percentage:
-        return cmyk_im
-    cmyk_im = cmyk_im.split()
-    cmyk = []
-    for i in xrange(4):
-        cmyk.append(cmyk_im[i].load())
-    for x in xrange(im.size[0]):
-        for y in xrange(im.size[1]):
-            gray = min(cmyk[0][x,y], cmyk[1][x,y], cmyk[2][x,y]) * percentage / 100
-            for i in xrange(3):
-                cmyk[i][x,y] = cmyk[i][x,y] - gray
-            cmyk[3][x,y] = gray
-    return Image.merge('CMYK', cmyk_im)
+def screen_angles(text, count=4):
+    '''Returns count screen angles from a comma separated list of degrees.
+        Channels missing from the list keep the 15 degree steps.'''
+    angles = [float(angle) for angle in text.split(',') if angle.strip()]
+    return angles[:count] + [15.0 * index for index in range(len(angles), count)]
 
-def halftone(im, cmyk, sample, scale):
+def halftone(im, cmyk, sample, scale, workers=None, angles=None, screen='rotate',
+             sprites=False):
     '''Returns list of half-tone images for cmyk image. sample (pixels),
         determines the sample box size from the original image. The maximum
         output dot diameter is given by sample * scale (which is also the number
         of possible dot sizes). So sample=1 will presevere the original image
-        resolution, but scale must be >1 to allow variation in dot size.'''
+        resolution, but scale must be >1 to allow variation in dot size.
+        The separations are screened in parallel by up to workers processes,
+        at angles (degrees, one per channel, 15 degree steps by default).
+        screen is 'rotate' to rotate every separation under an upright
+        screen, or 'lattice' to sample it on a rotated dot lattice. With
+        sprites the dots are stamped from pre-rendered anti-aliased discs.'''
     cmyk = cmyk.split()
-    dots = []
-    angle = 0
-    for channel in cmyk:
-        channel = channel.rotate(angle, expand=1)
-        size = channel.size[0]*scale, channel.size[1]*scale
-        half_tone = Image.new('L', size)
-        draw = ImageDraw.Draw(half_tone)
-        for x in xrange(0, channel.size[0], sample):
-            for y in xrange(0, channel.size[1], sample):
-                box = channel.crop((x, y, x + sample, y + sample))
-                stat = ImageStat.Stat(box)
-                diameter = (stat.mean[0] / 255)**0.5
-                edge = 0.5*(1-diameter)
-                x_pos, y_pos = (x+edge)*scale, (y+edge)*scale
-                box_edge = sample*diameter*scale
-                draw.ellipse((x_pos, y_pos, x_pos + box_edge, y_pos + box_edge), fill=255)
-        half_tone = half_tone.rotate(-angle, expand=1)
-        width_half, height_half = half_tone.size
-        xx=(width_half-im.size[0]*scale) / 2
-        yy=(height_half-im.size[1]*scale) / 2
-        half_tone = half_tone.crop((xx, yy, xx + im.size[0]*scale, yy + im.size[1]*scale))
-        dots.append(half_tone)
-        angle += 15
-    return dots
+    if angles is None:
+        angles = [15 * index for index in range(len(cmyk))]
+    dots = channel_pool.map_channels(SCREENS[screen], cmyk, (im.size, sample, scale, sprites),
+                                     workers, [(angle,) for angle in angles])
+    return [Image.fromarray(half_tone) for half_tone in dots]
 
 inkex.localize()
 
@@ -78,15 +107,42 @@ inkex.localize()
 class newsprint_filter(inkex.Effect):
 	def __init__(self):
 		inkex.Effect.__init__(self)
+		self.OptionParser.add_option("-g", "--gcr",
+						action="store", type="int",
+						dest="gcr", default=0,
+						help="percentage of the gray component moved from the CMY channels to K")
+		self.OptionParser.add_option("--screen",
+						action="store", type="string",
+						dest="screen", default="rotate",
+						help="screening mode, rotate (rotate each separation) or lattice (rotated dot lattice)")
+		self.OptionParser.add_option("--angles",
+						action="store", type="string",
+						dest="angles", default="0,15,30,45",
+						help="comma separated screen angles of the C, M, Y and K separations in degrees")
+		self.OptionParser.add_option("--sprites",
+						action="store", type="inkbool",
+						dest="sprites", default=False,
+						help="stamp anti-aliased dots from a pre-rendered sprite atlas instead of drawing each dot")
+		self.OptionParser.add_option("--channel_workers",
+						action="store", type="int",
+						dest="channel_workers", default=0,
+						help="number of processes the CMYK channels are spread over, 0 for one per channel (up to the CPU core count)")
  	def effect(self):
+		try:
+			angles = screen_angles(self.options.angles)
+		except ValueError:
+			inkex.errormsg('Screen angles must be comma separated numbers, not %r' % self.options.angles)
+			sys.exit(1)
   		image_node = None
   		for node in self.selected.values():
   			if(common.is_image(node)):
    				image_node = node
   			if image_node is not None:
    				image = common.prep_image(image_node)
-   				cmyk = gcr(image, 0)
-   				dots = halftone(image, cmyk, 10, 1)
+   				cmyk = separation.gcr(image, self.options.gcr)
+   				dots = halftone(image, cmyk, 10, 1, self.options.channel_workers or None,
+   				                angles, self.options.screen,
+   				                self.options.sprites)
    				image = Image.merge('CMYK', dots)
    				image = image.convert('RGB')
    				common.save_image(image_node, image, img_format='PNG')
@@ -19,62 +19,15 @@ from PIL import Image, ImageDraw, ImageStat
 import inkex
 import simplestyle
 import os
+import sys
 import common
+from halftone_lib import patterns
 
-def intensity(arr):
-  #  calcluates intensity of a pixel from 0 to 9
-  mini = 999
-  maxi = 0
-  for i in range(len(arr)):
-    for j in range(len(arr[0])):
-      maxi = max(arr[i][j],maxi)
-      mini = min(arr[i][j],mini)
-  level = float(float(maxi-mini)/float(10));
-  brr = [[0]*len(arr[0]) for i in range(len(arr))]
-  for i in range(10):
-    l1 = mini+level*i
-    l2 = l1+level
-    for j in range(len(arr)):
-      for k in range(len(arr[0])):
-        if(arr[j][k] >= l1 and arr[j][k] <= l2):
-          brr[j][k]=i
-  return brr
-
-
-def pattern(image):
-    # based on the intensity maps pixel to the corresponding block of 3*3  
-    #  ---   ---   ---   -X-   -XX   -XX   -XX   -XX   XXX   XXX
-    #  ---   -X-   -XX   -XX   -XX   -XX   XXX   XXX   XXX   XXX
-    #  ---   ---   ---   ---   ---   -X-   -X-   XX-   XX-   XXX
-    #  9     8     7     6     5     4     3     2     1     0  
-    #  X = 0
-    #  - = 255
-    #  Therefore intensity 0 being the blackest block.
-  arr = numpy.asarray(image)
-  brr=intensity(arr)
-  gray_level = [[[0,0,0],[0,0,0],[0,0,0]] for i in range(10)]
-
-  gray_level[0] = [[0,0,0],[0,0,0],[0,0,0]];
-  gray_level[1] = [[0,255,0],[0,0,0],[0,0,0]];
-  gray_level[2] = [[0,255,0],[0,0,0],[0,0,255]];
-  gray_level[3] = [[255,255,0],[0,0,0],[0,0,255]];
-  gray_level[4] = [[255,255,0],[0,0,0],[255,0,255]];
-  gray_level[5] = [[255,255,255],[0,0,0],[255,0,255]];
-  gray_level[6] = [[255,255,255],[0,0,255],[255,0,255]];
-  gray_level[7] = [[255,255,255],[0,0,255],[255,255,255]];
-  gray_level[8] = [[255,255,255],[255,0,255],[255,255,255]];
-  gray_level[9] = [[255,255,255],[255,255,255],[255,255,255]];
-  crr = numpy.zeros((len(arr)*3,len(arr[0])*3))
-  cnt=0
-  for i in range(len(brr)):
-    cnt+=1
-    for j in range(len(brr[i])):
-      new_i = i+2*(i-1)
-      new_j = j+2*(j-1)
-      for k in range(3):
-        for l in range(3):
-          crr[new_i+k][new_j+l] = gray_level[brr[i][j]][k][l]
-  return crr
+def pattern(image, pattern_set=patterns.CLASSIC):
+  # based on the intensity maps every pixel to the n*n block of its level
+  # (see halftone_lib.patterns for the 3*3 blocks), intensity 0 being the
+  # blackest block
+  return pattern_set.expand_bilevel(numpy.asarray(image))
 
 
 
@@ -82,7 +35,20 @@ def pattern(image):
 class patterning(inkex.Effect):
 	def __init__(self):
 		inkex.Effect.__init__(self)
+		self.OptionParser.add_option("-p", "--pattern",
+						action="store", type="string",
+						dest="pattern", default="classic",
+						help="pattern set: classic (3x3), bayer or clustered")
+		self.OptionParser.add_option("-s", "--pattern_size",
+						action="store", type="int",
+						dest="pattern_size", default=4,
+						help="block size of the bayer (a power of two) or clustered pattern set")
 	def effect(self):
+		try:
+			pattern_set = patterns.get_pattern_set(self.options.pattern, self.options.pattern_size)
+		except (KeyError, ValueError) as error:
+			inkex.errormsg(error.args[0])
+			sys.exit(1)
 		image_node = None
 		for node in self.selected.values():
 			if(common.is_image(node)):
@@ -90,10 +56,9 @@ class patterning(inkex.Effect):
 			if image_node is not None:
 				image = common.prep_image(image_node)
 				image = image.convert('L')
-				data = pattern(image)
-				image = Image.fromarray(data)
-				image = image.convert('RGB')
-				common.save_image(image_node, image, img_format='PNG')
+				data = pattern(image, pattern_set)
+				# 1 bit per pixel all the way to a 1-bit PNG
+				common.save_image(image_node, data, img_format='PNG')
 
 if __name__ == '__main__':
 	obj = patterning()
@@ -26,6 +26,7 @@ import numpy as np
 
 import inkex
 import simplestyle
+from halftone_lib import channel_pool, coords, kernels, svg_emit, svg_stream, svg_style, svgz, wavefront
 
 
 try:
@@ -46,12 +47,69 @@ except:
 class raster_to_svg_error_diffusion(inkex.Effect):
     def __init__(self):
         inkex.Effect.__init__(self)
+        self.stream = None
 
         self.OptionParser.add_option("-t", "--width",
                                      action="store", type="int",
                                      dest="width", default=200,
                                      help="this variable will be used to resize the original selected image to a width of whatever \
                                      you enter and height proportional to the new width, thus maintaining the aspect ratio")
+        self.OptionParser.add_option("-k", "--kernel",
+                                     action="store", type="string",
+                                     dest="kernel", default="floyd-steinberg",
+                                     help="error diffusion kernel, one of: " + ", ".join(sorted(kernels.KERNELS)))
+        self.OptionParser.add_option("-w", "--workers",
+                                     action="store", type="int",
+                                     dest="workers", default=1,
+                                     help="number of worker processes for wavefront parallel diffusion, 0 for one per CPU core")
+        self.OptionParser.add_option("--report_speedup",
+                                     action="store", type="inkbool",
+                                     dest="report_speedup", default=False,
+                                     help="also run the serial engine and report the speedup of the parallel one")
+        self.OptionParser.add_option("--channel_workers",
+                                     action="store", type="int",
+                                     dest="channel_workers", default=0,
+                                     help="number of processes the CMYK channels are spread over, 0 for one per channel (up to the CPU core count)")
+        self.OptionParser.add_option("-e", "--emitter",
+                                     action="store", type="string",
+                                     dest="emitter", default="circles",
+                                     help="SVG output: circles (one element per dot), path (one path of circles per colour), rects (one rect per run of dots), run-path (one path of runs per colour) or contours (outlines of the dark regions, one path per colour)")
+        self.OptionParser.add_option("--merge_rows",
+                                     action="store", type="inkbool",
+                                     dest="merge_rows", default=False,
+                                     help="merge identical runs of consecutive rows into one taller run")
+        self.OptionParser.add_option("--tracing",
+                                     action="store", type="string",
+                                     dest="tracing", default="exact",
+                                     help="contour tracing: exact (along the pixel edges) or simplified (Douglas-Peucker to the tolerance)")
+        self.OptionParser.add_option("--tolerance",
+                                     action="store", type="float",
+                                     dest="tolerance", default=0.5,
+                                     help="largest distance in pixels a simplified contour may stray from the exact one")
+        self.OptionParser.add_option("--report_reduction",
+                                     action="store", type="inkbool",
+                                     dest="report_reduction", default=False,
+                                     help="report the elements and bytes saved over one circle per dot")
+        self.OptionParser.add_option("--css",
+                                     action="store", type="inkbool",
+                                     dest="css", default=False,
+                                     help="shared CSS classes in a <style> element instead of inline styles, blend modes set once per separation group")
+        self.OptionParser.add_option("--stream",
+                                     action="store", type="inkbool",
+                                     dest="stream", default=False,
+                                     help="write the dots to the output as they are generated instead of building them as elements of the document first (for very large images)")
+        self.OptionParser.add_option("--svgz_path",
+                                     action="store", type="string",
+                                     dest="svgz_path", default="",
+                                     help="write the document to this gzip-compressed .svgz file, compressed as it is written, instead of returning it to Inkscape")
+        self.OptionParser.add_option("--svgz_level",
+                                     action="store", type="int",
+                                     dest="svgz_level", default=6,
+                                     help="gzip compression level of the .svgz file, 1 (fastest) to 9 (smallest)")
+        self.OptionParser.add_option("--precision",
+                                     action="store", type="int",
+                                     dest="precision", default=-1,
+                                     help="decimals kept in the coordinates, written in their shortest form (and path data without needless commas); -1 writes them in full")
         
 
     def getImagePath(self, node, xlink):
@@ -125,7 +183,7 @@ class raster_to_svg_error_diffusion(inkex.Effect):
     def draw_rectangle(self,(x, y), (l,b), color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
+        attribs = {'style': svg_style.format_style(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('rect', 'svg'), attribs)
@@ -134,7 +192,7 @@ class raster_to_svg_error_diffusion(inkex.Effect):
     def draw_circle(self,(x, y), r, color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
+        attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('circle', 'svg'), attribs)
@@ -143,47 +201,69 @@ class raster_to_svg_error_diffusion(inkex.Effect):
     def draw_ellipse(self,(x, y), (r1,r2), color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
+        attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('ellipse', 'svg'), attribs)
         return obj
 
+    def draw_path(self, d, color, parent, id_):
+        
+        style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
+        attribs = {'style': svg_style.format_style(style), 'd': d}
+        if id_ is not None:
+            attribs.update({'id': id_})
+        obj = inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), attribs)
+        return obj
+
+    def report_reduction(self, output, color, elements):
+        # compares the size of the elements against one circle per dot
+        xs, ys = svg_emit.dot_centres(output)
+        scratch = inkex.etree.Element(inkex.addNS('g', 'svg'))
+        template = svg_emit.serialized_size(self.draw_circle((0, 0), 1, color, scratch, 'id'))
+        size = sum(svg_emit.serialized_size(element) for element in elements)
+        inkex.errormsg(svg_emit.reduction_report(color, len(xs), len(elements),
+                                                 svg_emit.circles_size(xs, ys, template), size))
+
+    def circle_items(self, output, color):
+        # the circles draw_svg would add, generated while the output is written
+        tag = inkex.addNS('circle', 'svg')
+        style = svg_style.format_style({'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"})
+        for x, y in svg_emit.iter_dot_centres(output):
+            attribs = {'style': style, 'cx': str(x), 'cy': str(y), 'r': '1', 'id': 'id'}
+            yield tag, attribs
+
     def draw_svg(self,output,color,parent):
-        startu = 0
-        endu = 0
-        for i in range(len(output)):
-            for j in range(len(output[i])):
-                if (output[i][j]==0):
-                    self.draw_circle((int((startu+startu+1)/2),int((endu+endu+1)/2)),1,color,parent,'id')
-                    #dwg.add(dwg.circle((int((startu+startu+1)/2),int((endu+endu+1)/2)),1,fill=color,style="mix-blend-mode: multiply;"))        
-                startu = startu+2                                                                               
-            endu = endu+2
-            startu = 0
+        if self.options.emitter != 'circles':
+            elements = []
+            tolerance = self.options.tolerance if self.options.tracing == 'simplified' else 0
+            for tag, geometry in svg_emit.shapes(output, self.options.emitter, self.options.merge_rows,
+                                                 tolerance):
+                if tag == 'rect':
+                    elements.append(self.draw_rectangle(geometry[:2], geometry[2:], color, parent, 'id'))
+                else:
+                    if self.options.precision >= 0:
+                        geometry = coords.compact_path(geometry)
+                    elements.append(self.draw_path(geometry, color, parent, 'id'))
+            if self.options.report_reduction:
+                self.report_reduction(output, color, elements)
+            return
+        if self.stream is not None:
+            self.stream.stream(parent, self.circle_items(output, color))
+            return
+        # the dots are formatted in bulk, not a str() per pixel
+        xs, ys = svg_emit.dot_centres(output)
+        for x, y in zip(coords.compact(xs), coords.compact(ys)):
+            self.draw_circle((x, y), 1, color, parent, 'id')
    
 
-    def error_dispersion(self,image):
-        arr = np.asarray(image)
-        height = len(arr)
-        width = len(arr[0])
-        err = [[0]*len(arr[0]) for i in range(len(arr))]
-        crr = np.zeros((len(arr),len(arr[0])))
-        for i in range(height):
-            for j in range(width):
-                if(arr[i][j] + err[i][j] < 128):
-                    crr[i][j] = 0 
-                else:
-                    crr[i][j] = 255
-                diff = arr[i][j] + err[i][j] - crr[i][j]
-                if(j+1 < width):
-                    err[i][j+1] = float(float(err[i][j+1]) + float(diff*float(float(7)/float(16))))
-                if(i+1 < height):
-                    err[i+1][j] = float(float(err[i+1][j]) + float(diff*float(float(5)/float(16))))
-                if(i+1 < height and j-1 >= 0):
-                    err[i+1][j-1] = float(float(err[i+1][j-1]) + float(diff*float(float(3)/float(16))))
-                if(i+1 < height and j+1 < width):
-                    err[i+1][j+1] = float(float(err[i+1][j+1]) + float(diff*float(float(1)/float(16))))
-        return crr
+    def error_dispersion(self,channels):
+        # one worker process per separation, see channel_pool
+        kernel = kernels.get_kernel(self.options.kernel)
+        report = inkex.errormsg if self.options.report_speedup else None
+        return channel_pool.map_channels(wavefront.diffuse, channels,
+                                         (kernel, self.options.workers or None, False, report),
+                                         self.options.channel_workers or None)
 
     def diffusion(self, node):
         image = self.getImage(node)
@@ -200,19 +280,31 @@ class raster_to_svg_error_diffusion(inkex.Effect):
             nodeParent.insert(nodeIndex+1, pixel2svg_group)
             self.draw_rectangle((0,0),(basewidth,hsize),'white',pixel2svg_group,'id')
             cmyk = image.split()  
-            output_cyan = self.error_dispersion(cmyk[0])
-            output_magenta = self.error_dispersion(cmyk[1])
-            output_yellow = self.error_dispersion(cmyk[2])
+            output_cyan, output_magenta, output_yellow = self.error_dispersion(cmyk[:3])
             self.draw_svg(output_cyan,'cyan',pixel2svg_group)
             self.draw_svg(output_magenta,'magenta',pixel2svg_group)
             self.draw_svg(output_yellow,'yellow',pixel2svg_group)
+            if self.options.css:
+                svg_style.use_classes(pixel2svg_group, self.document.getroot(), self.stream)
             nodeParent.remove(node)
         else:
             inkex.errormsg(_("Bailing out: No supported image file or data found"))
             sys.exit(1)
 
+    def output(self):
+        if self.options.svgz_path:
+            write = self.document.write if self.stream is None else self.stream.write
+            sizes = svgz.write_svgz(self.options.svgz_path, write, self.options.svgz_level)
+            inkex.errormsg(svgz.report(self.options.svgz_path, *sizes))
+        elif self.stream is None:
+            inkex.Effect.output(self)
+        else:
+            self.stream.write(sys.stdout)
+
     def effect(self):
         found_image = False
+        if self.options.stream:
+            self.stream = svg_stream.DocumentStream(self.document)
         if (self.options.ids):
             for node in self.selected.itervalues():
                 if node.tag == inkex.addNS('image', 'svg'):
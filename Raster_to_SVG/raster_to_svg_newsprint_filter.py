@@ -20,11 +20,12 @@ import base64
 import StringIO
 from urllib import url2pathname
 from urlparse import urlparse
-from PIL import Image, ImageDraw, ImageStat
+from PIL import Image, ImageDraw
 
 
 import inkex
 import simplestyle
+from halftone_lib import cells, channel_pool, coords, separation, svg_emit, svg_stream, svg_style, svgz
 
 try:
     inkex.localize()
@@ -44,6 +45,55 @@ except:
 class raster_to_svg_newsprint_filter(inkex.Effect):
     def __init__(self):
         inkex.Effect.__init__(self)
+        self.stream = None
+        self.OptionParser.add_option("-g", "--gcr",
+                                     action="store", type="int",
+                                     dest="gcr", default=0,
+                                     help="percentage of the gray component moved from the CMY channels to K")
+        self.OptionParser.add_option("--instancing",
+                                     action="store", type="inkbool",
+                                     dest="instancing", default=False,
+                                     help="define every dot size once as a symbol and draw the dots as <use> references")
+        self.OptionParser.add_option("--radius_step",
+                                     action="store", type="float",
+                                     dest="radius_step", default=0.1,
+                                     help="the dot radii are rounded to multiples of this step when instancing")
+        self.OptionParser.add_option("--channel_workers",
+                                     action="store", type="int",
+                                     dest="channel_workers", default=0,
+                                     help="number of processes the CMYK channels are spread over, 0 for one per channel (up to the CPU core count)")
+        self.OptionParser.add_option("--css",
+                                     action="store", type="inkbool",
+                                     dest="css", default=False,
+                                     help="shared CSS classes in a <style> element instead of inline styles, blend modes set once per separation group")
+        self.OptionParser.add_option("--stream",
+                                     action="store", type="inkbool",
+                                     dest="stream", default=False,
+                                     help="write the dots to the output as they are generated instead of building them as elements of the document first (for very large images)")
+        self.OptionParser.add_option("--svgz_path",
+                                     action="store", type="string",
+                                     dest="svgz_path", default="",
+                                     help="write the document to this gzip-compressed .svgz file, compressed as it is written, instead of returning it to Inkscape")
+        self.OptionParser.add_option("--svgz_level",
+                                     action="store", type="int",
+                                     dest="svgz_level", default=6,
+                                     help="gzip compression level of the .svgz file, 1 (fastest) to 9 (smallest)")
+        self.OptionParser.add_option("--precision",
+                                     action="store", type="int",
+                                     dest="precision", default=-1,
+                                     help="decimals kept in the coordinates, written in their shortest form (and path data without needless commas); -1 writes them in full")
+        self.OptionParser.add_option("--cull",
+                                     action="store", type="inkbool",
+                                     dest="cull", default=False,
+                                     help="leave out the dots too small to see, radius min_radius or less (light cells give dots of radius 0 or less)")
+        self.OptionParser.add_option("--min_radius",
+                                     action="store", type="float",
+                                     dest="min_radius", default=0.0,
+                                     help="dots of this radius or less are culled")
+        self.OptionParser.add_option("--report_culling",
+                                     action="store", type="inkbool",
+                                     dest="report_culling", default=False,
+                                     help="report the dots culled from each separation and the drawing time saved")
         
 
     def getImagePath(self, node, xlink):
@@ -117,7 +167,7 @@ class raster_to_svg_newsprint_filter(inkex.Effect):
     def draw_rectangle(self,(x, y), (l,b), color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
+        attribs = {'style': svg_style.format_style(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('rect', 'svg'), attribs)
@@ -126,7 +176,7 @@ class raster_to_svg_newsprint_filter(inkex.Effect):
     def draw_circle(self,(x, y), r, color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
+        attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('circle', 'svg'), attribs)
@@ -136,58 +186,66 @@ class raster_to_svg_newsprint_filter(inkex.Effect):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
         if(transform == 1.5):
-            attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(1.5)'}
+            attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(1.5)'}
         elif(transform == 3):
-            attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(3)'}
+            attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(3)'}
         else:
-            attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(0)'}
+            attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(0)'}
 
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('ellipse', 'svg'), attribs)
         return obj
 
-    def gcr(self,im, percentage):
-        cmyk_im = im.convert('CMYK')
-        if not percentage:
-            return cmyk_im
-        cmyk_im = cmyk_im.split()
-        cmyk = []
-        for i in xrange(4):
-            cmyk.append(cmyk_im[i].load())
-        for x in xrange(im.size[0]):
-            for y in xrange(im.size[1]):
-                gray = min(cmyk[0][x,y], cmyk[1][x,y], cmyk[2][x,y]) * percentage / 100
-                for i in xrange(3):
-                    cmyk[i][x,y] = cmyk[i][x,y] - gray
-                cmyk[3][x,y] = gray
-        return Image.merge('CMYK', cmyk_im)
+    def get_defs(self):
+        """Return <defs> element, created if not already present."""
+        defs = self.document.getroot().find(inkex.addNS('defs', 'svg'))
+        if defs is None:
+            defs = inkex.etree.SubElement(self.document.getroot(),
+                                          inkex.addNS('defs', 'svg'))
+        return defs
+
+    def ellipse_items(self, dots, color, transform):
+        # the ellipses halftone would add, generated while the output is written
+        tag = inkex.addNS('ellipse', 'svg')
+        style = svg_style.format_style({'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"})
+        for x, y, radius in dots:
+            attribs = {'style': style, 'cx': str(x), 'cy': str(y), 'rx': str(radius), 'ry': str(radius),'transform': 'rotate(%s)' % transform, 'id': 'id'}
+            yield tag, attribs
+
+    def draw_separations(self, parent, colors, transforms, separations):
+        if self.options.instancing:
+            precision = self.options.precision if self.options.precision >= 0 else None
+            svg_emit.draw_instances(parent, self.get_defs(), colors, transforms, separations,
+                                    self.options.radius_step, precision, self.stream)
+            return
+        if self.options.precision >= 0:
+            separations = [coords.compact_dots(dots, self.options.precision) for dots in separations]
+        for color, transform, dots in zip(colors, transforms, separations):
+            if self.stream is not None:
+                self.stream.stream(parent, self.ellipse_items(dots, color, transform))
+                continue
+            for x, y, radius in dots:
+                self.draw_ellipse((x,y),(radius,radius),color,parent,'id',transform)
 
     def halftone(self,parent,im, cmyk, sample, scale,):
-        dots = []
-        angle = 0 
-        count = 0
         cmyk = cmyk.split()
-        for channel in cmyk:
-            count=count+1
-            size = channel.size[0]*scale, channel.size[1]*scale
-            for x in xrange(0, channel.size[0], sample):
-                for y in xrange(0, channel.size[1], sample):
-                    box = channel.crop((x, y, x + sample, y + sample))
-                    stat = ImageStat.Stat(box)
-                    diameter = (stat.mean[0] / 255)**0.5
-                    edge = 0.5*(1-diameter)
-                    x_pos, y_pos = (x+edge)*scale, (y+edge)*scale
-                    box_edge = sample*diameter*scale
-                    if(count==1):
-                        self.draw_ellipse(((2*x_pos+box_edge)/2,(2*y_pos+box_edge)/2),(box_edge-5,box_edge-5),'cyan',parent,'id',0)
-                      
-                    elif(count==2):
-                        self.draw_ellipse(((2*x_pos+box_edge)/2,(2*y_pos+box_edge)/2),(box_edge-5,box_edge-5),'magenta',parent,'id',1.5)
-    
-                    elif(count==3):
-                        self.draw_ellipse(((2*x_pos+box_edge)/2,(2*y_pos+box_edge)/2),(box_edge-5,box_edge-5),'yellow',parent,'id',3)
-
+        colors = ['cyan', 'magenta', 'yellow']
+        if self.options.gcr:
+            # the gray component moved to K has to be drawn as well
+            colors.append('black')
+        transforms = [0, 1.5, 3, 0]
+        separations = channel_pool.map_channels(cells.channel_dots, cmyk[:len(colors)], (sample, scale),
+                                                self.options.channel_workers or None)
+        if self.options.cull:
+            totals = [len(dots) for dots in separations]
+            separations = [svg_emit.cull_dots(dots, self.options.min_radius) for dots in separations]
+        if self.options.cull and self.options.report_culling:
+            report = svg_emit.CullingReport(colors, totals, separations, self.stream)
+            report.draw(self.draw_separations, parent, colors, transforms, separations)
+            report.deliver(inkex.errormsg)
+        else:
+            self.draw_separations(parent, colors, transforms, separations)
 
     def clustered(self, node):
        
@@ -200,15 +258,29 @@ class raster_to_svg_newsprint_filter(inkex.Effect):
             pixel2svg_group.set('id', "%s_pixel2svg" % node.get('id'))
             nodeParent.insert(nodeIndex+1, pixel2svg_group)
             self.draw_rectangle((0,0),(width,height),'white',pixel2svg_group,'id')
-            cmyk = self.gcr(image,0)
+            cmyk = separation.gcr(image,self.options.gcr)
             self.halftone(pixel2svg_group,image,cmyk,10,1)
+            if self.options.css:
+                svg_style.use_classes(pixel2svg_group, self.document.getroot(), self.stream)
             nodeParent.remove(node)
         else:
             inkex.errormsg(_("Bailing out: No supported image file or data found"))
             sys.exit(1)
 
+    def output(self):
+        if self.options.svgz_path:
+            write = self.document.write if self.stream is None else self.stream.write
+            sizes = svgz.write_svgz(self.options.svgz_path, write, self.options.svgz_level)
+            inkex.errormsg(svgz.report(self.options.svgz_path, *sizes))
+        elif self.stream is None:
+            inkex.Effect.output(self)
+        else:
+            self.stream.write(sys.stdout)
+
     def effect(self):
         found_image = False
+        if self.options.stream:
+            self.stream = svg_stream.DocumentStream(self.document)
         if (self.options.ids):
             for node in self.selected.itervalues():
                 if node.tag == inkex.addNS('image', 'svg'):
@@ -26,6 +26,7 @@ import numpy as np
 
 import inkex
 import simplestyle
+from halftone_lib import coords, svg_emit, svg_stream, svg_style, svgz, threshold
 
 
 try:
@@ -46,12 +47,61 @@ except:
 class raster_to_svg_ordered_dithering(inkex.Effect):
     def __init__(self):
         inkex.Effect.__init__(self)
+        self.stream = None
 
         self.OptionParser.add_option("-t", "--width",
                                      action="store", type="int",
                                      dest="width", default=200,
                                      help="this variable will be used to resize the original selected image to a width of whatever \
                                      you enter and height proportional to the new width, thus maintaining the aspect ratio")
+        self.OptionParser.add_option("-m", "--matrix",
+                                     action="store", type="string",
+                                     dest="matrix", default="classic",
+                                     help="threshold matrix: classic (3x3), bayer or clustered")
+        self.OptionParser.add_option("-s", "--matrix_size",
+                                     action="store", type="int",
+                                     dest="matrix_size", default=4,
+                                     help="size of the bayer (a power of two) or clustered threshold matrix")
+        self.OptionParser.add_option("-e", "--emitter",
+                                     action="store", type="string",
+                                     dest="emitter", default="circles",
+                                     help="SVG output: circles (one element per dot), path (one path of circles per colour), rects (one rect per run of dots), run-path (one path of runs per colour) or contours (outlines of the dark regions, one path per colour)")
+        self.OptionParser.add_option("--merge_rows",
+                                     action="store", type="inkbool",
+                                     dest="merge_rows", default=False,
+                                     help="merge identical runs of consecutive rows into one taller run")
+        self.OptionParser.add_option("--tracing",
+                                     action="store", type="string",
+                                     dest="tracing", default="exact",
+                                     help="contour tracing: exact (along the pixel edges) or simplified (Douglas-Peucker to the tolerance)")
+        self.OptionParser.add_option("--tolerance",
+                                     action="store", type="float",
+                                     dest="tolerance", default=0.5,
+                                     help="largest distance in pixels a simplified contour may stray from the exact one")
+        self.OptionParser.add_option("--report_reduction",
+                                     action="store", type="inkbool",
+                                     dest="report_reduction", default=False,
+                                     help="report the elements and bytes saved over one circle per dot")
+        self.OptionParser.add_option("--css",
+                                     action="store", type="inkbool",
+                                     dest="css", default=False,
+                                     help="shared CSS classes in a <style> element instead of inline styles, blend modes set once per separation group")
+        self.OptionParser.add_option("--stream",
+                                     action="store", type="inkbool",
+                                     dest="stream", default=False,
+                                     help="write the dots to the output as they are generated instead of building them as elements of the document first (for very large images)")
+        self.OptionParser.add_option("--svgz_path",
+                                     action="store", type="string",
+                                     dest="svgz_path", default="",
+                                     help="write the document to this gzip-compressed .svgz file, compressed as it is written, instead of returning it to Inkscape")
+        self.OptionParser.add_option("--svgz_level",
+                                     action="store", type="int",
+                                     dest="svgz_level", default=6,
+                                     help="gzip compression level of the .svgz file, 1 (fastest) to 9 (smallest)")
+        self.OptionParser.add_option("--precision",
+                                     action="store", type="int",
+                                     dest="precision", default=-1,
+                                     help="decimals kept in the coordinates, written in their shortest form (and path data without needless commas); -1 writes them in full")
         
 
     def getImagePath(self, node, xlink):
@@ -125,7 +175,7 @@ class raster_to_svg_ordered_dithering(inkex.Effect):
     def draw_rectangle(self,(x, y), (l,b), color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
+        attribs = {'style': svg_style.format_style(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('rect', 'svg'), attribs)
@@ -134,7 +184,7 @@ class raster_to_svg_ordered_dithering(inkex.Effect):
     def draw_circle(self,(x, y), r, color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
+        attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('circle', 'svg'), attribs)
@@ -143,57 +193,70 @@ class raster_to_svg_ordered_dithering(inkex.Effect):
     def draw_ellipse(self,(x, y), (r1,r2), color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
+        attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('ellipse', 'svg'), attribs)
         return obj
 
     
+    def draw_path(self, d, color, parent, id_):
+        
+        style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
+        attribs = {'style': svg_style.format_style(style), 'd': d}
+        if id_ is not None:
+            attribs.update({'id': id_})
+        obj = inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), attribs)
+        return obj
+
+    def report_reduction(self, output, color, elements):
+        # compares the size of the elements against one circle per dot
+        xs, ys = svg_emit.dot_centres(output)
+        scratch = inkex.etree.Element(inkex.addNS('g', 'svg'))
+        template = svg_emit.serialized_size(self.draw_circle((0, 0), 1, color, scratch, 'id'))
+        size = sum(svg_emit.serialized_size(element) for element in elements)
+        inkex.errormsg(svg_emit.reduction_report(color, len(xs), len(elements),
+                                                 svg_emit.circles_size(xs, ys, template), size))
+
+    def circle_items(self, output, color):
+        # the circles draw_svg would add, generated while the output is written
+        tag = inkex.addNS('circle', 'svg')
+        style = svg_style.format_style({'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"})
+        for x, y in svg_emit.iter_dot_centres(output):
+            attribs = {'style': style, 'cx': str(x), 'cy': str(y), 'r': '1', 'id': 'id'}
+            yield tag, attribs
+
     def draw_svg(self,output,parent):
-        startu = 0
-        endu = 0
-        for i in range(len(output)):
-            for j in range(len(output[i])):
-                if (output[i][j]==0):
-                    self.draw_circle((int((startu+startu+1)/2),int((endu+endu+1)/2)),1,'black',parent,'id')
-                    #dwg.add(dwg.circle((int((startu+startu+1)/2),int((endu+endu+1)/2)),1,fill='black'))        
-                startu = startu+2                                                                               
-            endu = endu+2
-            startu = 0
-
-  #dwg.save() 
-    def intensity(self,arr):
-  #  calcluates intensity of a pixel from 0 to 9
-        mini = 999
-        maxi = 0
-        for i in range(len(arr)):
-            for j in range(len(arr[0])):
-                maxi = max(arr[i][j],maxi)
-                mini = min(arr[i][j],mini)
-        level = float(float(maxi-mini)/float(10));
-        brr = [[0]*len(arr[0]) for i in range(len(arr))]
-        for i in range(10):
-            l1 = mini+level*i
-            l2 = l1+level
-            for j in range(len(arr)):
-                for k in range(len(arr[0])):
-                    if(arr[j][k] >= l1 and arr[j][k] <= l2):
-                        brr[j][k]=i
-        return brr
+        if self.options.emitter != 'circles':
+            elements = []
+            tolerance = self.options.tolerance if self.options.tracing == 'simplified' else 0
+            for tag, geometry in svg_emit.shapes(output, self.options.emitter, self.options.merge_rows,
+                                                 tolerance):
+                if tag == 'rect':
+                    elements.append(self.draw_rectangle(geometry[:2], geometry[2:], 'black', parent, 'id'))
+                else:
+                    if self.options.precision >= 0:
+                        geometry = coords.compact_path(geometry)
+                    elements.append(self.draw_path(geometry, 'black', parent, 'id'))
+            if self.options.report_reduction:
+                self.report_reduction(output, 'black', elements)
+            return
+        if self.stream is not None:
+            self.stream.stream(parent, self.circle_items(output, 'black'))
+            return
+        # the dots are formatted in bulk, not a str() per pixel
+        xs, ys = svg_emit.dot_centres(output)
+        for x, y in zip(coords.compact(xs), coords.compact(ys)):
+            self.draw_circle((x, y), 1, 'black', parent, 'id')
 
     def order_dither(self,image):
-        arr = np.asarray(image)
-        brr = self.intensity(arr)
-        crr = [[8, 3, 4], [6, 1, 2], [7, 5, 9]]
-        drr = np.zeros((len(arr),len(arr[0])))
-        for i in range(len(arr)):
-            for j in range(len(arr[0])):
-                if(brr[i][j] > crr[i%3][j%3]):
-                    drr[i][j] = 255
-            else:
-                drr[i][j] = 0
-        return drr
+        # compares the image against the tiled threshold matrix in one go
+        try:
+            threshold_map = threshold.get_map(self.options.matrix, self.options.matrix_size)
+        except (KeyError, ValueError) as error:
+            inkex.errormsg(error.args[0])
+            sys.exit(1)
+        return threshold_map.dither(np.asarray(image))
 
 
     
@@ -217,13 +280,27 @@ class raster_to_svg_ordered_dithering(inkex.Effect):
             self.draw_rectangle((0,0),(basewidth,hsize),'white',pixel2svg_group,'id')
             output = self.order_dither(image)
             self.draw_svg(output,pixel2svg_group)
+            if self.options.css:
+                svg_style.use_classes(pixel2svg_group, self.document.getroot(), self.stream)
             nodeParent.remove(node)
         else:
             inkex.errormsg(_("Bailing out: No supported image file or data found"))
             sys.exit(1)
 
+    def output(self):
+        if self.options.svgz_path:
+            write = self.document.write if self.stream is None else self.stream.write
+            sizes = svgz.write_svgz(self.options.svgz_path, write, self.options.svgz_level)
+            inkex.errormsg(svgz.report(self.options.svgz_path, *sizes))
+        elif self.stream is None:
+            inkex.Effect.output(self)
+        else:
+            self.stream.write(sys.stdout)
+
     def effect(self):
         found_image = False
+        if self.options.stream:
+            self.stream = svg_stream.DocumentStream(self.document)
         if (self.options.ids):
             for node in self.selected.itervalues():
                 if node.tag == inkex.addNS('image', 'svg'):
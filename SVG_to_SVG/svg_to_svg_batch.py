@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""Copyright (c) 2017 abhishek-sehgal954
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+'''Run one of the SVG to SVG effects on many documents from the command line,
+exporting with a pool of long-lived Inkscape shell processes
+(--renderer=inkscape-shell) so Inkscape starts once per worker instead of
+once per document.
+
+usage: svg_to_svg_batch.py [--workers=N] [--output_dir=DIR] EFFECT
+                           [--option=value ...] FILE...
+
+Run it from the inkscape extensions directory the effects are installed in.
+EFFECT is clustered_dot, newsprint_filter, ordered_dithering or
+error_diffusion; the --option=value arguments are passed on to it and must
+include --inkscape_path. Without --id every image of a document is
+halftoned, or in a document without images every drawable object in its
+layers, each over its own bounding box (--export_area=selection is the
+default); a document with neither counts as failed. Several objects with
+--export_area=page are refused, since each would get a halftone of the
+whole page. N documents (default 2) are worked on at once, each worker thread
+with its own Inkscape; the PNGs come back over pipes, so no temporary files
+are shared. The results are written under their own names to DIR (default
+halftoned).
+'''
+import os
+import sys
+import imp
+import time
+import Queue
+import threading
+from optparse import OptionParser
+
+from lxml import etree
+
+from halftone_lib import shell_pool
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+EFFECTS = ['clustered_dot', 'newsprint_filter', 'ordered_dithering', 'error_diffusion']
+
+SVG = '{http://www.w3.org/2000/svg}'
+GROUPMODE = '{http://www.inkscape.org/namespaces/inkscape}groupmode'
+DRAWABLE = set(SVG + name for name in ['g', 'path', 'rect', 'circle', 'ellipse', 'line', 'polyline',
+                                        'polygon', 'text', 'image', 'use'])
+
+
+def option_value(arguments, name, default=None):
+    '''Returns the value of the last --name=value in arguments.'''
+    value = default
+    for argument in arguments:
+        if argument.startswith('--%s=' % name):
+            value = argument.split('=', 1)[1]
+    return value
+
+
+def layer_objects(group):
+    '''Yields the drawable children of group, and of the layers in it.'''
+    for child in group:
+        if child.tag == SVG + 'g' and child.get(GROUPMODE) == 'layer':
+            for node in layer_objects(child):
+                yield node
+        elif child.tag in DRAWABLE:
+            yield child
+
+
+def selection_ids(path):
+    '''Returns the --id arguments selecting every image of the document, or
+        if it has none every drawable object in its layers.'''
+    root = etree.parse(path).getroot()
+    nodes = [image for image in root.iter(SVG + 'image') if image.get('id')]
+    if not nodes:
+        nodes = [node for node in layer_objects(root) if node.get('id')]
+    if not nodes:
+        raise RuntimeError('nothing to halftone: no image or drawable object with an id')
+    return ['--id=%s' % node.get('id') for node in nodes]
+
+
+def check_area(arguments):
+    '''Raises RuntimeError if arguments select several objects with
+        --export_area=page, which would stack full page halftones.'''
+    ids = [argument for argument in arguments if argument.startswith('--id=')]
+    if len(ids) > 1 and option_value(arguments, 'export_area', 'page') == 'page':
+        raise RuntimeError('%d objects with --export_area=page would each get a halftone of '
+                           'the whole page, use --export_area=selection or one --id' % len(ids))
+
+
+def run_effect(effect_class, arguments, path, output_path):
+    '''Runs the effect on one document and writes the result.'''
+    if not option_value(arguments, 'id'):
+        if not option_value(arguments, 'export_area'):
+            arguments = arguments + ['--export_area=selection']
+        arguments = arguments + selection_ids(path)
+        check_area(arguments)
+    effect = effect_class()
+    effect.affect(['--renderer=inkscape-shell'] + arguments + [path], output=False)
+    effect.document.write(output_path)
+
+
+def worker(effect_class, arguments, paths, output_dir, failures):
+    while True:
+        try:
+            path = paths.get_nowait()
+        except Queue.Empty:
+            return
+        output_path = os.path.join(output_dir, os.path.basename(path))
+        start = time.time()
+        try:
+            run_effect(effect_class, arguments, path, output_path)
+        except (Exception, SystemExit) as error:
+            # the effects call sys.exit when they bail out
+            failures.append(path)
+            sys.stderr.write('%s: failed (%s)\n' % (path, error))
+            continue
+        sys.stderr.write('%s -> %s (%.2fs)\n' % (path, output_path, time.time() - start))
+
+
+def main(argv):
+    parser = OptionParser(usage='%prog [--workers=N] [--output_dir=DIR] EFFECT [--option=value ...] FILE...')
+    parser.disable_interspersed_args()
+    parser.add_option("--workers", action="store", type="int", dest="workers", default=2,
+                      help="documents worked on at once, each with its own Inkscape shell")
+    parser.add_option("--output_dir", action="store", type="string", dest="output_dir",
+                      default="halftoned", help="folder the halftoned documents are written to")
+    options, args = parser.parse_args(argv)
+    if not args or args[0] not in EFFECTS:
+        parser.error('choose the effect: %s' % ', '.join(EFFECTS))
+    name = args[0]
+    arguments = [argument for argument in args[1:] if argument.startswith('--')]
+    files = [argument for argument in args[1:] if not argument.startswith('--')]
+    inkscape_path = option_value(arguments, 'inkscape_path')
+    if not inkscape_path:
+        parser.error('give the effect --inkscape_path')
+    try:
+        check_area(arguments)
+    except RuntimeError as error:
+        parser.error(error.args[0])
+    if not os.path.isdir(options.output_dir):
+        os.makedirs(options.output_dir)
+    for path in files:
+        if os.path.abspath(os.path.dirname(path)) == os.path.abspath(options.output_dir):
+            parser.error('%s would be overwritten, choose another --output_dir' % path)
+    module = imp.load_source(name, os.path.join(HERE, 'svg_to_svg_%s.py' % name))
+    effect_class = getattr(module, name)
+    workers = max(1, min(options.workers, len(files)))
+    pool = shell_pool.shared_pool(inkscape_path, workers)
+    paths = Queue.Queue()
+    for path in files:
+        paths.put(path)
+    failures = []
+    start = time.time()
+    threads = [threading.Thread(target=worker,
+                                args=(effect_class, arguments, paths, options.output_dir, failures))
+               for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    shell_pool.close_pools()
+    sys.stderr.write('%d documents, %d exports with %d Inkscape shells, %.2fs\n'
+                     % (len(files), pool.exports, workers, time.time() - start))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
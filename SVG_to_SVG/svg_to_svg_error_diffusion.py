@@ -26,6 +26,7 @@ import inkex
 import simpletransform
 from PIL import Image, ImageStat, ImageDraw
 import simplestyle
+from halftone_lib import channel_pool, export_cache, kernels, renderers, svg_emit, svg_style, svgz, wavefront
 inkex.localize()
 
 class error_diffusion(inkex.Effect):
@@ -38,18 +39,74 @@ class error_diffusion(inkex.Effect):
                                      dest="width", default=200,
                                      help="this variable will be used to resize the original selected image to a width of whatever \
                                      you enter and height proportional to the new width, thus maintaining the aspect ratio")
+        self.OptionParser.add_option("-k", "--kernel",
+                                     action="store", type="string",
+                                     dest="kernel", default="floyd-steinberg",
+                                     help="error diffusion kernel, one of: " + ", ".join(sorted(kernels.KERNELS)))
+        self.OptionParser.add_option("-w", "--workers",
+                                     action="store", type="int",
+                                     dest="workers", default=1,
+                                     help="number of worker processes for wavefront parallel diffusion, 0 for one per CPU core")
+        self.OptionParser.add_option("--report_speedup",
+                                     action="store", type="inkbool",
+                                     dest="report_speedup", default=False,
+                                     help="also run the serial engine and report the speedup of the parallel one")
+        self.OptionParser.add_option("--channel_workers",
+                                     action="store", type="int",
+                                     dest="channel_workers", default=0,
+                                     help="number of processes the CMYK channels are spread over, 0 for one per channel (up to the CPU core count)")
+        self.OptionParser.add_option("-e", "--emitter",
+                                     action="store", type="string",
+                                     dest="emitter", default="circles",
+                                     help="SVG output: circles (one element per dot), path (one path of circles per colour), rects (one rect per run of dots), run-path (one path of runs per colour) or contours (outlines of the dark regions, one path per colour)")
+        self.OptionParser.add_option("--merge_rows",
+                                     action="store", type="inkbool",
+                                     dest="merge_rows", default=False,
+                                     help="merge identical runs of consecutive rows into one taller run")
+        self.OptionParser.add_option("--tracing",
+                                     action="store", type="string",
+                                     dest="tracing", default="exact",
+                                     help="contour tracing: exact (along the pixel edges) or simplified (Douglas-Peucker to the tolerance)")
+        self.OptionParser.add_option("--tolerance",
+                                     action="store", type="float",
+                                     dest="tolerance", default=0.5,
+                                     help="largest distance in pixels a simplified contour may stray from the exact one")
+        self.OptionParser.add_option("--report_reduction",
+                                     action="store", type="inkbool",
+                                     dest="report_reduction", default=False,
+                                     help="report the elements and bytes saved over one circle per dot")
+        self.OptionParser.add_option("--css",    action="store", type="inkbool",  dest="css",    default=False,        help="shared CSS classes in a <style> element instead of inline styles, blend modes set once per separation group")
+        self.OptionParser.add_option("--svgz_path",    action="store", type="string",  dest="svgz_path",    default="",        help="write the document to this gzip-compressed .svgz file, compressed as it is written, instead of returning it to Inkscape")
+        self.OptionParser.add_option("--svgz_level",    action="store", type="int",  dest="svgz_level",    default=6,        help="gzip compression level of the .svgz file, 1 (fastest) to 9 (smallest)")
+        self.OptionParser.add_option("--renderer",    action="store", type="string",  dest="renderer",    default="auto",        help="page renderer: auto (the first available of cairosvg and inkscape), cairosvg (in this process), inkscape (a new Inkscape process) or inkscape-shell (a pool of long-lived Inkscape shell processes, see svg_to_svg_batch.py)")
+        self.OptionParser.add_option("--export_area",    action="store", type="string",  dest="export_area",    default="page",        help="what is rasterized: page (the whole page at 96 dpi, for every selected object) or selection (the bounding box of each selected object, at the width of its halftone)")
+        self.OptionParser.add_option("--export_cache",    action="store", type="string",  dest="export_cache",    default="",        help="folder keeping the rendered exports, reused when the same document is rendered again the same way (e.g. to try other settings); empty for no cache")
+        self.OptionParser.add_option("--export_cache_size",    action="store", type="int",  dest="export_cache_size",    default=256,        help="the least recently used exports are removed from the cache above this size, in megabytes")
+        self.OptionParser.add_option("--report_cache",    action="store", type="inkbool",  dest="report_cache",    default=False,        help="report the cache hits and misses of the run")
         self.OptionParser.add_option("--inkscape_path",    action="store", type="string",  dest="inkscape_path",    default="",        help="")
         self.OptionParser.add_option("--temp_path",    action="store", type="string",  dest="temp_path",    default="",        help="")
 
+    def output(self):
+        if self.options.svgz_path:
+            sizes = svgz.write_svgz(self.options.svgz_path, self.document.write, self.options.svgz_level)
+            inkex.errormsg(svgz.report(self.options.svgz_path, *sizes))
+        else:
+            inkex.Effect.output(self)
+
     def effect(self):
         outfile = self.options.temp_path
         curfile = self.args[-1]
-        self.exportPage(curfile,outfile)
+        try:
+            self.exportPage(curfile,outfile)
+        except RuntimeError as error:
+            # the renderer failed, e.g. Inkscape exported nothing
+            inkex.errormsg(error.args[0])
+            sys.exit(1)
 
     def draw_rectangle(self,(x, y), (l,b), color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
+        attribs = {'style': svg_style.format_style(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('rect', 'svg'), attribs)
@@ -58,7 +115,7 @@ class error_diffusion(inkex.Effect):
     def draw_circle(self,(x, y), r, color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
+        attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('circle', 'svg'), attribs)
@@ -68,18 +125,48 @@ class error_diffusion(inkex.Effect):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
         if(transform == 1.5):
-            attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
+            attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
         elif(transform == 3):
-            attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
+            attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
         else:
-            attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
+            attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
 
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('ellipse', 'svg'), attribs)
         return obj
 
+    def draw_path(self, d, color, parent, id_):
+        
+        style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
+        attribs = {'style': svg_style.format_style(style), 'd': d}
+        if id_ is not None:
+            attribs.update({'id': id_})
+        obj = inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), attribs)
+        return obj
+
+    def report_reduction(self, output, color, elements):
+        # compares the size of the elements against one circle per dot
+        xs, ys = svg_emit.dot_centres(output)
+        scratch = inkex.etree.Element(inkex.addNS('g', 'svg'))
+        template = svg_emit.serialized_size(self.draw_circle((0, 0), 1, color, scratch, 'id'))
+        size = sum(svg_emit.serialized_size(element) for element in elements)
+        inkex.errormsg(svg_emit.reduction_report(color, len(xs), len(elements),
+                                                 svg_emit.circles_size(xs, ys, template), size))
+
     def draw_svg(self,output,color,parent):
+        if self.options.emitter != 'circles':
+            elements = []
+            tolerance = self.options.tolerance if self.options.tracing == 'simplified' else 0
+            for tag, geometry in svg_emit.shapes(output, self.options.emitter, self.options.merge_rows,
+                                                 tolerance):
+                if tag == 'rect':
+                    elements.append(self.draw_rectangle(geometry[:2], geometry[2:], color, parent, 'id'))
+                else:
+                    elements.append(self.draw_path(geometry, color, parent, 'id'))
+            if self.options.report_reduction:
+                self.report_reduction(output, color, elements)
+            return
         startu = 0
         endu = 0
         for i in range(len(output)):
@@ -91,28 +178,13 @@ class error_diffusion(inkex.Effect):
             endu = endu+2
             startu = 0
 
-    def error_dispersion(self,image):
-        arr = np.asarray(image)
-        height = len(arr)
-        width = len(arr[0])
-        err = [[0]*len(arr[0]) for i in range(len(arr))]
-        crr = np.zeros((len(arr),len(arr[0])))
-        for i in range(height):
-            for j in range(width):
-                if(arr[i][j] + err[i][j] < 128):
-                    crr[i][j] = 0 
-                else:
-                    crr[i][j] = 255
-                diff = arr[i][j] + err[i][j] - crr[i][j]
-                if(j+1 < width):
-                    err[i][j+1] = float(float(err[i][j+1]) + float(diff*float(float(7)/float(16))))
-                if(i+1 < height):
-                    err[i+1][j] = float(float(err[i+1][j]) + float(diff*float(float(5)/float(16))))
-                if(i+1 < height and j-1 >= 0):
-                    err[i+1][j-1] = float(float(err[i+1][j-1]) + float(diff*float(float(3)/float(16))))
-                if(i+1 < height and j+1 < width):
-                    err[i+1][j+1] = float(float(err[i+1][j+1]) + float(diff*float(float(1)/float(16))))
-        return crr
+    def error_dispersion(self,channels):
+        # one worker process per separation, see channel_pool
+        kernel = kernels.get_kernel(self.options.kernel)
+        report = inkex.errormsg if self.options.report_speedup else None
+        return channel_pool.map_channels(wavefront.diffuse, channels,
+                                         (kernel, self.options.workers or None, False, report),
+                                         self.options.channel_workers or None)
 
                 
                 
@@ -121,7 +193,8 @@ class error_diffusion(inkex.Effect):
             basewidth = self.options.width
             wpercent = (basewidth/float(image.size[0]))
             hsize = int((float(image.size[1])*float(wpercent)))
-            image = image.resize((basewidth,hsize), Image.ANTIALIAS)
+            if image.size[0] != basewidth:
+                image = image.resize((basewidth,hsize), Image.ANTIALIAS)
             (width, height) = image.size
             nodeParent = node.getparent()
             nodeIndex = nodeParent.index(node)
@@ -129,7 +202,8 @@ class error_diffusion(inkex.Effect):
             pixel2svg_group.set('id', "%s_pixel2svg" % node.get('id'))
             nodeParent.insert(nodeIndex+1, pixel2svg_group)
             nodeParent.remove(node)
-            self.draw_rectangle((0,0),(width,height),'white',pixel2svg_group,'id')
+            # behind the dot grid: pixel (i, j) covers 2 units around (2j, 2i)
+            self.draw_rectangle((-1,-1),(2*width,2*height),'white',pixel2svg_group,'id')
             image = image.convert("RGBA") 
             pixel_data = image.load()
             if image.mode == "RGBA":
@@ -139,12 +213,12 @@ class error_diffusion(inkex.Effect):
                         pixel_data[x, y] = (255, 255, 255, 255)
             image.thumbnail([image.size[0], image.size[1]], Image.ANTIALIAS)
             cmyk = image.split()  
-            output_cyan = self.error_dispersion(cmyk[0])
-            output_magenta = self.error_dispersion(cmyk[1])
-            output_yellow = self.error_dispersion(cmyk[2])
+            output_cyan, output_magenta, output_yellow = self.error_dispersion(cmyk[:3])
             self.draw_svg(output_cyan,'cyan',pixel2svg_group)
             self.draw_svg(output_magenta,'magenta',pixel2svg_group)
             self.draw_svg(output_yellow,'yellow',pixel2svg_group)
+            if self.options.css:
+                svg_style.use_classes(pixel2svg_group, self.document.getroot())
         else:
             inkex.errormsg(_("Bailing out: No supported image file or data found"))
             sys.exit(1)
@@ -152,18 +226,39 @@ class error_diffusion(inkex.Effect):
     
         
     def exportPage(self, curfile, outfile):
-        command = "%s %s --export-png %s" %(self.options.inkscape_path,curfile,outfile)
-        p = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return_code = p.wait()
-        f = p.stdout
-        err = p.stderr
-        img = Image.open(outfile)
+        try:
+            renderer = renderers.get_renderer(self.options.renderer, self.options.inkscape_path, outfile)
+        except (KeyError, RuntimeError) as error:
+            inkex.errormsg(error.args[0])
+            sys.exit(1)
+        if self.options.export_cache:
+            cache = export_cache.ExportCache(self.options.export_cache, self.options.export_cache_size * 1024 * 1024)
+            renderer = renderers.CachedRenderer(renderer, cache)
+        img = None
+        if self.options.export_area == 'page':
+            img = renderer.render(curfile)
         
 
         if (self.options.ids):
             for node in self.selected.itervalues():
                 found_image = True
-                self.diffusion(node,img)
+                area = None
+                if self.options.export_area == 'selection':
+                    area = renderers.node_area(node)
+                if area is None:
+                    # the whole page, as for objects without a measurable bounding box
+                    if img is None:
+                        img = renderer.render(curfile)
+                    self.diffusion(node,img)
+                    continue
+                # only the bounding box of the node, already at the width of the halftone
+                parent = node.getparent()
+                index = parent.index(node)
+                image = renderer.render(curfile, node, self.options.width)
+                self.diffusion(node,image)
+                parent[index].set('transform', renderers.area_transform(area, 2 * self.options.width, parent, -1))
+        if self.options.export_cache and self.options.report_cache:
+            inkex.errormsg(renderer.cache.report())
          
         
 def main():
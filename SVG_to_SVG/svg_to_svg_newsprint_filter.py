@@ -23,8 +23,9 @@ import math
 
 import inkex
 import simpletransform
-from PIL import Image, ImageStat, ImageDraw
+from PIL import Image, ImageDraw
 import simplestyle
+from halftone_lib import cells, channel_pool, export_cache, renderers, separation, svg_emit, svg_style, svgz
 inkex.localize()
 
 class newsprint_filter(inkex.Effect):
@@ -32,19 +33,44 @@ class newsprint_filter(inkex.Effect):
 		def __init__(self):
 				"""Init the effect library and get options from gui."""
 				inkex.Effect.__init__(self)
+				self.OptionParser.add_option("-g", "--gcr",    action="store", type="int",  dest="gcr",    default=0,        help="percentage of the gray component moved from the CMY channels to K")
+				self.OptionParser.add_option("--channel_workers",    action="store", type="int",  dest="channel_workers",    default=0,        help="number of processes the CMYK channels are spread over, 0 for one per channel (up to the CPU core count)")
+				self.OptionParser.add_option("--css",    action="store", type="inkbool",  dest="css",    default=False,        help="shared CSS classes in a <style> element instead of inline styles, blend modes set once per separation group")
+				self.OptionParser.add_option("--svgz_path",    action="store", type="string",  dest="svgz_path",    default="",        help="write the document to this gzip-compressed .svgz file, compressed as it is written, instead of returning it to Inkscape")
+				self.OptionParser.add_option("--svgz_level",    action="store", type="int",  dest="svgz_level",    default=6,        help="gzip compression level of the .svgz file, 1 (fastest) to 9 (smallest)")
+				self.OptionParser.add_option("--cull",    action="store", type="inkbool",  dest="cull",    default=False,        help="leave out the dots too small to see, radius min_radius or less (light cells give dots of radius 0 or less)")
+				self.OptionParser.add_option("--min_radius",    action="store", type="float",  dest="min_radius",    default=0.0,        help="dots of this radius or less are culled")
+				self.OptionParser.add_option("--report_culling",    action="store", type="inkbool",  dest="report_culling",    default=False,        help="report the dots culled from each separation and the drawing time saved")
+				self.OptionParser.add_option("--renderer",    action="store", type="string",  dest="renderer",    default="auto",        help="page renderer: auto (the first available of cairosvg and inkscape), cairosvg (in this process), inkscape (a new Inkscape process) or inkscape-shell (a pool of long-lived Inkscape shell processes, see svg_to_svg_batch.py)")
+				self.OptionParser.add_option("--export_area",    action="store", type="string",  dest="export_area",    default="page",        help="what is rasterized: page (the whole page at 96 dpi, for every selected object) or selection (the bounding box of each selected object, at the width of its halftone)")
+				self.OptionParser.add_option("--export_cache",    action="store", type="string",  dest="export_cache",    default="",        help="folder keeping the rendered exports, reused when the same document is rendered again the same way (e.g. to try other settings); empty for no cache")
+				self.OptionParser.add_option("--export_cache_size",    action="store", type="int",  dest="export_cache_size",    default=256,        help="the least recently used exports are removed from the cache above this size, in megabytes")
+				self.OptionParser.add_option("--report_cache",    action="store", type="inkbool",  dest="report_cache",    default=False,        help="report the cache hits and misses of the run")
 				self.OptionParser.add_option("--inkscape_path",    action="store", type="string",  dest="inkscape_path",    default="",        help="")
 				self.OptionParser.add_option("--temp_path",    action="store", type="string",  dest="temp_path",    default="",        help="")
 
+		def output(self):
+				if self.options.svgz_path:
+						sizes = svgz.write_svgz(self.options.svgz_path, self.document.write, self.options.svgz_level)
+						inkex.errormsg(svgz.report(self.options.svgz_path, *sizes))
+				else:
+						inkex.Effect.output(self)
+
 		def effect(self):
 				outfile = self.options.temp_path
 				curfile = self.args[-1]
 				inkscape_path = self.options.inkscape_path
-				self.exportPage(curfile,outfile,inkscape_path)
+				try:
+						self.exportPage(curfile,outfile,inkscape_path)
+				except RuntimeError as error:
+						# the renderer failed, e.g. Inkscape exported nothing
+						inkex.errormsg(error.args[0])
+						sys.exit(1)
 
 		def draw_rectangle(self,(x, y), (l,b), color, parent, id_):
 				
 				style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-				attribs = {'style': simplestyle.formatStyle(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
+				attribs = {'style': svg_style.format_style(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
 				if id_ is not None:
 						attribs.update({'id': id_})
 				obj = inkex.etree.SubElement(parent, inkex.addNS('rect', 'svg'), attribs)
@@ -53,7 +79,7 @@ class newsprint_filter(inkex.Effect):
 		def draw_circle(self,(x, y), r, color, parent, id_):
 				
 				style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-				attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
+				attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
 				if id_ is not None:
 						attribs.update({'id': id_})
 				obj = inkex.etree.SubElement(parent, inkex.addNS('circle', 'svg'), attribs)
@@ -63,60 +89,41 @@ class newsprint_filter(inkex.Effect):
 				
 				style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
 				if(transform == 1.5):
-						attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(1.5)'}
+						attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(1.5)'}
 				elif(transform == 3):
-						attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(3)'}
+						attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(3)'}
 				else:
-						attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(0)'}
+						attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2),'transform': 'rotate(0)'}
 
 				if id_ is not None:
 						attribs.update({'id': id_})
 				obj = inkex.etree.SubElement(parent, inkex.addNS('ellipse', 'svg'), attribs)
 				return obj
 
-		def gcr(self,im, percentage):
-				cmyk_im = im.convert('CMYK')
-				if not percentage:
-						return cmyk_im
-				cmyk_im = cmyk_im.split()
-				cmyk = []
-				for i in xrange(4):
-						cmyk.append(cmyk_im[i].load())
-				for x in xrange(im.size[0]):
-						for y in xrange(im.size[1]):
-								gray = min(cmyk[0][x,y], cmyk[1][x,y], cmyk[2][x,y]) * percentage / 100
-								for i in xrange(3):
-										cmyk[i][x,y] = cmyk[i][x,y] - gray
-								cmyk[3][x,y] = gray
-				return Image.merge('CMYK', cmyk_im)
+		def draw_separations(self, parent, colors, transforms, separations):
+				for color, transform, dots in zip(colors, transforms, separations):
+						for x, y, radius in dots:
+								self.draw_ellipse((x,y),(radius,radius),color,parent,'id',transform)
 
 		def halftone(self,parent,im, cmyk, sample, scale,):
-				dots = []
-				angle = 0 
-				count = 0
 				cmyk = cmyk.split()
-				for channel in cmyk:
-						count=count+1
-						size = channel.size[0]*scale, channel.size[1]*scale
-						for x in xrange(0, channel.size[0], sample):
-								for y in xrange(0, channel.size[1], sample):
-										box = channel.crop((x, y, x + sample, y + sample))
-										stat = ImageStat.Stat(box)
-										diameter = (stat.mean[0] / 255)**0.5
-										edge = 0.5*(1-diameter)
-										x_pos, y_pos = (x+edge)*scale, (y+edge)*scale
-										box_edge = sample*diameter*scale
-										if(count==1):
-												self.draw_ellipse(((2*x_pos+box_edge)/2,(2*y_pos+box_edge)/2),(box_edge-5,box_edge-5),'cyan',parent,'id',0)
-											
-										elif(count==2):
-												self.draw_ellipse(((2*x_pos+box_edge)/2,(2*y_pos+box_edge)/2),(box_edge-5,box_edge-5),'magenta',parent,'id',1.5)
-									 
-										elif(count==3):
-												self.draw_ellipse(((2*x_pos+box_edge)/2,(2*y_pos+box_edge)/2),(box_edge-5,box_edge-5),'yellow',parent,'id',3)
-											 
-								
-								
+				colors = ['cyan', 'magenta', 'yellow']
+				if self.options.gcr:
+						# the gray component moved to K has to be drawn as well
+						colors.append('black')
+				transforms = [0, 1.5, 3, 0]
+				separations = channel_pool.map_channels(cells.channel_dots, cmyk[:len(colors)], (sample, scale),
+				                                        self.options.channel_workers or None)
+				if self.options.cull:
+						totals = [len(dots) for dots in separations]
+						separations = [svg_emit.cull_dots(dots, self.options.min_radius) for dots in separations]
+				if self.options.cull and self.options.report_culling:
+						report = svg_emit.CullingReport(colors, totals, separations)
+						report.draw(self.draw_separations, parent, colors, transforms, separations)
+						report.deliver(inkex.errormsg)
+				else:
+						self.draw_separations(parent, colors, transforms, separations)
+
 		def newsprint(self,node,image):
 			 	if image:
 						(width, height) = image.size
@@ -135,8 +142,10 @@ class newsprint_filter(inkex.Effect):
 												if pixel_data[x, y][3] < 255:
 														pixel_data[x, y] = (255, 255, 255, 255)
 						image.thumbnail([image.size[0], image.size[1]], Image.ANTIALIAS)
-						cmyk = self.gcr(image,0)
+						cmyk = separation.gcr(image,self.options.gcr)
 						self.halftone(pixel2svg_group,image,cmyk,10,1)
+						if self.options.css:
+								svg_style.use_classes(pixel2svg_group, self.document.getroot())
 				else:
 						inkex.errormsg(_("Bailing out: No supported image file or data found"))
 						sys.exit(1)
@@ -144,18 +153,39 @@ class newsprint_filter(inkex.Effect):
 		
 				
 		def exportPage(self, curfile, outfile,inkscape_path):
-				command = "%s %s --export-png %s" %(inkscape_path,curfile,outfile)
-				p = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-				return_code = p.wait()
-				f = p.stdout
-				err = p.stderr
-				img = Image.open(outfile)
+				try:
+						renderer = renderers.get_renderer(self.options.renderer, inkscape_path, outfile)
+				except (KeyError, RuntimeError) as error:
+						inkex.errormsg(error.args[0])
+						sys.exit(1)
+				if self.options.export_cache:
+						cache = export_cache.ExportCache(self.options.export_cache, self.options.export_cache_size * 1024 * 1024)
+						renderer = renderers.CachedRenderer(renderer, cache)
+				img = None
+				if self.options.export_area == 'page':
+						img = renderer.render(curfile)
 				
 
 				if (self.options.ids):
 						for node in self.selected.itervalues():
 								found_image = True
-								self.newsprint(node,img)
+								area = None
+								if self.options.export_area == 'selection':
+										area = renderers.node_area(node)
+								if area is None:
+										# the whole page, as for objects without a measurable bounding box
+										if img is None:
+												img = renderer.render(curfile)
+										self.newsprint(node,img)
+										continue
+								# only the bounding box of the node, at 96 dpi
+								parent = node.getparent()
+								index = parent.index(node)
+								image = renderer.render(curfile, node, None)
+								self.newsprint(node,image)
+								parent[index].set('transform', renderers.area_transform(area, image.size[0], parent))
+				if self.options.export_cache and self.options.report_cache:
+						inkex.errormsg(renderer.cache.report())
 				 
 def main():
 		e = newsprint_filter()
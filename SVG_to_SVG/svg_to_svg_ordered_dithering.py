@@ -26,6 +26,7 @@ import inkex
 import simpletransform
 from PIL import Image, ImageStat, ImageDraw
 import simplestyle
+from halftone_lib import export_cache, renderers, svg_emit, svg_style, svgz, threshold
 inkex.localize()
 
 class ordered_dithering(inkex.Effect):
@@ -38,19 +39,67 @@ class ordered_dithering(inkex.Effect):
                                      dest="width", default=200,
                                      help="this variable will be used to resize the original selected image to a width of whatever \
                                      you enter and height proportional to the new width, thus maintaining the aspect ratio")
+        self.OptionParser.add_option("-m", "--matrix",
+                                     action="store", type="string",
+                                     dest="matrix", default="classic",
+                                     help="threshold matrix: classic (3x3), bayer or clustered")
+        self.OptionParser.add_option("-s", "--matrix_size",
+                                     action="store", type="int",
+                                     dest="matrix_size", default=4,
+                                     help="size of the bayer (a power of two) or clustered threshold matrix")
+        self.OptionParser.add_option("-e", "--emitter",
+                                     action="store", type="string",
+                                     dest="emitter", default="circles",
+                                     help="SVG output: circles (one element per dot), path (one path of circles per colour), rects (one rect per run of dots), run-path (one path of runs per colour) or contours (outlines of the dark regions, one path per colour)")
+        self.OptionParser.add_option("--merge_rows",
+                                     action="store", type="inkbool",
+                                     dest="merge_rows", default=False,
+                                     help="merge identical runs of consecutive rows into one taller run")
+        self.OptionParser.add_option("--tracing",
+                                     action="store", type="string",
+                                     dest="tracing", default="exact",
+                                     help="contour tracing: exact (along the pixel edges) or simplified (Douglas-Peucker to the tolerance)")
+        self.OptionParser.add_option("--tolerance",
+                                     action="store", type="float",
+                                     dest="tolerance", default=0.5,
+                                     help="largest distance in pixels a simplified contour may stray from the exact one")
+        self.OptionParser.add_option("--report_reduction",
+                                     action="store", type="inkbool",
+                                     dest="report_reduction", default=False,
+                                     help="report the elements and bytes saved over one circle per dot")
+        self.OptionParser.add_option("--css",    action="store", type="inkbool",  dest="css",    default=False,        help="shared CSS classes in a <style> element instead of inline styles, blend modes set once per separation group")
+        self.OptionParser.add_option("--svgz_path",    action="store", type="string",  dest="svgz_path",    default="",        help="write the document to this gzip-compressed .svgz file, compressed as it is written, instead of returning it to Inkscape")
+        self.OptionParser.add_option("--svgz_level",    action="store", type="int",  dest="svgz_level",    default=6,        help="gzip compression level of the .svgz file, 1 (fastest) to 9 (smallest)")
+        self.OptionParser.add_option("--renderer",    action="store", type="string",  dest="renderer",    default="auto",        help="page renderer: auto (the first available of cairosvg and inkscape), cairosvg (in this process), inkscape (a new Inkscape process) or inkscape-shell (a pool of long-lived Inkscape shell processes, see svg_to_svg_batch.py)")
+        self.OptionParser.add_option("--export_area",    action="store", type="string",  dest="export_area",    default="page",        help="what is rasterized: page (the whole page at 96 dpi, for every selected object) or selection (the bounding box of each selected object, at the width of its halftone)")
+        self.OptionParser.add_option("--export_cache",    action="store", type="string",  dest="export_cache",    default="",        help="folder keeping the rendered exports, reused when the same document is rendered again the same way (e.g. to try other settings); empty for no cache")
+        self.OptionParser.add_option("--export_cache_size",    action="store", type="int",  dest="export_cache_size",    default=256,        help="the least recently used exports are removed from the cache above this size, in megabytes")
+        self.OptionParser.add_option("--report_cache",    action="store", type="inkbool",  dest="report_cache",    default=False,        help="report the cache hits and misses of the run")
         self.OptionParser.add_option("--inkscape_path",    action="store", type="string",  dest="inkscape_path",    default="",        help="")
         self.OptionParser.add_option("--temp_path",    action="store", type="string",  dest="temp_path",    default="",        help="")
 
 
+    def output(self):
+        if self.options.svgz_path:
+            sizes = svgz.write_svgz(self.options.svgz_path, self.document.write, self.options.svgz_level)
+            inkex.errormsg(svgz.report(self.options.svgz_path, *sizes))
+        else:
+            inkex.Effect.output(self)
+
     def effect(self):
         outfile = self.options.temp_path
         curfile = self.args[-1]
-        self.exportPage(curfile,outfile)
+        try:
+            self.exportPage(curfile,outfile)
+        except RuntimeError as error:
+            # the renderer failed, e.g. Inkscape exported nothing
+            inkex.errormsg(error.args[0])
+            sys.exit(1)
 
     def draw_rectangle(self,(x, y), (l,b), color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
+        attribs = {'style': svg_style.format_style(style), 'x': str(x), 'y': str(y), 'width': str(l), 'height':str(b)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('rect', 'svg'), attribs)
@@ -59,7 +108,7 @@ class ordered_dithering(inkex.Effect):
     def draw_circle(self,(x, y), r, color, parent, id_):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
-        attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
+        attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'r': str(r)}
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('circle', 'svg'), attribs)
@@ -69,18 +118,48 @@ class ordered_dithering(inkex.Effect):
         
         style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
         if(transform == 1.5):
-            attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
+            attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
         elif(transform == 3):
-            attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
+            attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
         else:
-            attribs = {'style': simplestyle.formatStyle(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
+            attribs = {'style': svg_style.format_style(style), 'cx': str(x), 'cy': str(y), 'rx': str(r1), 'ry': str(r2)}
 
         if id_ is not None:
             attribs.update({'id': id_})
         obj = inkex.etree.SubElement(parent, inkex.addNS('ellipse', 'svg'), attribs)
         return obj
 
+    def draw_path(self, d, color, parent, id_):
+        
+        style = {'stroke': 'none', 'stroke-width': '1', 'fill': color,"mix-blend-mode" : "multiply"}
+        attribs = {'style': svg_style.format_style(style), 'd': d}
+        if id_ is not None:
+            attribs.update({'id': id_})
+        obj = inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), attribs)
+        return obj
+
+    def report_reduction(self, output, color, elements):
+        # compares the size of the elements against one circle per dot
+        xs, ys = svg_emit.dot_centres(output)
+        scratch = inkex.etree.Element(inkex.addNS('g', 'svg'))
+        template = svg_emit.serialized_size(self.draw_circle((0, 0), 1, color, scratch, 'id'))
+        size = sum(svg_emit.serialized_size(element) for element in elements)
+        inkex.errormsg(svg_emit.reduction_report(color, len(xs), len(elements),
+                                                 svg_emit.circles_size(xs, ys, template), size))
+
     def draw_svg(self,output,parent):
+        if self.options.emitter != 'circles':
+            elements = []
+            tolerance = self.options.tolerance if self.options.tracing == 'simplified' else 0
+            for tag, geometry in svg_emit.shapes(output, self.options.emitter, self.options.merge_rows,
+                                                 tolerance):
+                if tag == 'rect':
+                    elements.append(self.draw_rectangle(geometry[:2], geometry[2:], 'black', parent, 'id'))
+                else:
+                    elements.append(self.draw_path(geometry, 'black', parent, 'id'))
+            if self.options.report_reduction:
+                self.report_reduction(output, 'black', elements)
+            return
         startu = 0
         endu = 0
         for i in range(len(output)):
@@ -92,46 +171,22 @@ class ordered_dithering(inkex.Effect):
             endu = endu+2
             startu = 0
 
-  #dwg.save() 
-    def intensity(self,arr):
-  #  calcluates intensity of a pixel from 0 to 9
-        mini = 999
-        maxi = 0
-        for i in range(len(arr)):
-            for j in range(len(arr[0])):
-
-                maxi = max(arr[i][j],maxi)
-                mini = min(arr[i][j],mini)
-        level = float(float(maxi-mini)/float(10));
-        brr = [[0]*len(arr[0]) for i in range(len(arr))]
-        for i in range(10):
-            l1 = mini+level*i
-            l2 = l1+level
-            for j in range(len(arr)):
-                for k in range(len(arr[0])):
-                    if(arr[j][k] >= l1 and arr[j][k] <= l2):
-                        brr[j][k]=i
-        return brr
-
     def order_dither(self,image):
-        arr = np.asarray(image)
-        brr = self.intensity(arr)
-        crr = [[8, 3, 4], [6, 1, 2], [7, 5, 9]]
-        drr = np.zeros((len(arr),len(arr[0])))
-        for i in range(len(arr)):
-            for j in range(len(arr[0])):
-                if(brr[i][j] > crr[i%3][j%3]):
-                    drr[i][j] = 255
-            else:
-                drr[i][j] = 0
-        return drr
+        # compares the image against the tiled threshold matrix in one go
+        try:
+            threshold_map = threshold.get_map(self.options.matrix, self.options.matrix_size)
+        except (KeyError, ValueError) as error:
+            inkex.errormsg(error.args[0])
+            sys.exit(1)
+        return threshold_map.dither(np.asarray(image))
 
     def dithering(self,node,image):
         if image:
             basewidth = self.options.width
             wpercent = (basewidth/float(image.size[0]))
             hsize = int((float(image.size[1])*float(wpercent)))
-            image = image.resize((basewidth,hsize), Image.ANTIALIAS)
+            if image.size[0] != basewidth:
+                image = image.resize((basewidth,hsize), Image.ANTIALIAS)
             (width, height) = image.size
             nodeParent = node.getparent()
             nodeIndex = nodeParent.index(node)
@@ -148,27 +203,51 @@ class ordered_dithering(inkex.Effect):
                                 pixel_data[x, y] = (255, 255, 255, 255)
             image.thumbnail([image.size[0], image.size[1]], Image.ANTIALIAS)
             image = image.convert('L')
-            self.draw_rectangle((0,0),(width,height),'white',pixel2svg_group,'id')
+            # behind the dot grid: pixel (i, j) covers 2 units around (2j, 2i)
+            self.draw_rectangle((-1,-1),(2*width,2*height),'white',pixel2svg_group,'id')
             output = self.order_dither(image)
             self.draw_svg(output,pixel2svg_group)
+            if self.options.css:
+                svg_style.use_classes(pixel2svg_group, self.document.getroot())
         else:
             inkex.errormsg(_("Bailing out: No supported image file or data found"))
             sys.exit(1)
 
 
     def exportPage(self, curfile, outfile):
-        command = "%s %s --export-png %s" %(self.options.inkscape_path,curfile,outfile)
-        p = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return_code = p.wait()
-        f = p.stdout
-        err = p.stderr
-        img = Image.open(outfile)
+        try:
+            renderer = renderers.get_renderer(self.options.renderer, self.options.inkscape_path, outfile)
+        except (KeyError, RuntimeError) as error:
+            inkex.errormsg(error.args[0])
+            sys.exit(1)
+        if self.options.export_cache:
+            cache = export_cache.ExportCache(self.options.export_cache, self.options.export_cache_size * 1024 * 1024)
+            renderer = renderers.CachedRenderer(renderer, cache)
+        img = None
+        if self.options.export_area == 'page':
+            img = renderer.render(curfile)
         
 
         if (self.options.ids):
             for node in self.selected.itervalues():
                 found_image = True
-                self.dithering(node,img)
+                area = None
+                if self.options.export_area == 'selection':
+                    area = renderers.node_area(node)
+                if area is None:
+                    # the whole page, as for objects without a measurable bounding box
+                    if img is None:
+                        img = renderer.render(curfile)
+                    self.dithering(node,img)
+                    continue
+                # only the bounding box of the node, already at the width of the halftone
+                parent = node.getparent()
+                index = parent.index(node)
+                image = renderer.render(curfile, node, self.options.width)
+                self.dithering(node,image)
+                parent[index].set('transform', renderers.area_transform(area, 2 * self.options.width, parent, -1))
+        if self.options.export_cache and self.options.report_cache:
+            inkex.errormsg(renderer.cache.report())
          
         
 def main():
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""Copyright (c) 2017 abhishek-sehgal954
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+'''Time the page renderers of the SVG to SVG effects against each other.
+
+usage: renderer_benchmark.py EXTENSIONS_DIR [INKSCAPE [RUNS]]
+
+EXTENSIONS_DIR must hold simpletransform.py (the Inkscape share/extensions
+folder). Renders halftone_benchmark.svg RUNS times (default 3) with every
+renderer available here (the inkscape one needs the INKSCAPE binary), once
+the whole page and once only the benchmark image at 200 pixels wide, and
+prints the mean time and the size of the bitmap.
+'''
+import os
+import sys
+import time
+import tempfile
+
+from lxml import etree
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+SOURCE = os.path.join(HERE, 'halftone_benchmark.svg')
+
+
+def main(argv):
+    if not argv:
+        sys.exit(__doc__)
+    sys.path.insert(0, argv[0])
+    sys.path.insert(0, ROOT)
+    from halftone_lib import renderers
+    inkscape = argv[1] if len(argv) > 1 else ''
+    runs = int(argv[2]) if len(argv) > 2 else 3
+    node = etree.parse(SOURCE).getroot().xpath('//*[@id="benchmark_image"]')[0]
+    handle, temp_path = tempfile.mkstemp(suffix='.png')
+    os.close(handle)
+    print '%-10s %-10s %10s %12s' % ('renderer', 'area', 'seconds', 'size')
+    try:
+        for renderer in renderers.RENDERERS:
+            if not renderer.available(inkscape, temp_path):
+                print '%-10s %-10s %10s %12s' % (renderer.name, '-', '-', 'unavailable')
+                continue
+            instance = renderer(inkscape, temp_path)
+            for area, args in (('page', (None, None)), ('selection', (node, 200))):
+                start = time.time()
+                for run in range(runs):
+                    image = instance.render(SOURCE, *args)
+                    image.load()
+                seconds = (time.time() - start) / runs
+                print '%-10s %-10s %10.3f %12s' % (renderer.name, area, seconds, '%dx%d' % image.size)
+    finally:
+        os.remove(temp_path)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Copyright (c) 2017 abhishek-sehgal954
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+'''Time exporting halftone_benchmark.svg with a new Inkscape process per
+export against the pool of Inkscape shell processes (inkscape-shell renderer).
+
+usage: shell_pool_benchmark.py [INKSCAPE [EXPORTS [WORKERS]]]
+
+EXPORTS (default 12) exports are made each way, the pool runs them from
+WORKERS threads (default 1, 2 and 4). Without INKSCAPE the stand-in
+halftone_lib/shell_standin.py is used, with a start-up of 1 second and
+exports of 0.1 second.
+'''
+import os
+import sys
+import time
+import threading
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from halftone_lib import png_pipe, shell_pool
+
+SOURCE = os.path.join(HERE, 'halftone_benchmark.svg')
+STANDIN = os.path.join(os.path.dirname(HERE), 'halftone_lib', 'shell_standin.py')
+
+
+def new_processes(inkscape, exports):
+    command = [inkscape, SOURCE, '--export-png=%s' % png_pipe.PIPE_PATH]
+    for _ in range(exports):
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=open(os.devnull, 'w'))
+        png_pipe.split_output(process.communicate()[0])
+
+
+def pooled(inkscape, exports, workers):
+    pool = shell_pool.WorkerPool(inkscape, workers)
+    counts = [exports // workers + (index < exports % workers) for index in range(workers)]
+
+    def run(count):
+        for _ in range(count):
+            pool.export(SOURCE)
+
+    threads = [threading.Thread(target=run, args=(count,)) for count in counts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+
+
+def main(argv):
+    inkscape = argv[0] if argv and argv[0] else STANDIN
+    if inkscape == STANDIN:
+        os.environ.setdefault('SHELL_STANDIN_STARTUP', '1')
+        os.environ.setdefault('SHELL_STANDIN_DELAY', '0.1')
+    exports = int(argv[1]) if len(argv) > 1 else 12
+    worker_counts = [int(argv[2])] if len(argv) > 2 else [1, 2, 4]
+    print '%-24s %10s %12s' % ('exports', 'seconds', 'per export')
+    start = time.time()
+    new_processes(inkscape, exports)
+    seconds = time.time() - start
+    print '%-24s %10.2f %12.3f' % ('new process each', seconds, seconds / exports)
+    for workers in worker_counts:
+        start = time.time()
+        pooled(inkscape, exports, workers)
+        seconds = time.time() - start
+        print '%-24s %10.2f %12.3f' % ('shell pool of %d' % workers, seconds, seconds / exports)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
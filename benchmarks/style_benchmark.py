@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""Copyright (c) 2017 abhishek-sehgal954
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+'''Compare inline styles against shared CSS classes (--css) for the
+Raster to SVG effects.
+
+usage: style_benchmark.py EXTENSIONS_DIR [INKSCAPE]
+
+EXTENSIONS_DIR must hold inkex.py (the Inkscape share/extensions folder).
+Each effect is run on halftone_benchmark.svg with --css false and true; the
+file size and element count of both outputs are printed, and when an
+inkscape binary is given the time to render each output to PNG as well.
+'''
+import os
+import sys
+import imp
+import time
+import tempfile
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+SOURCE = os.path.join(HERE, 'halftone_benchmark.svg')
+EFFECTS = [
+    ('raster_to_svg_clustered_dot', []),
+    ('raster_to_svg_newsprint_filter', []),
+    ('raster_to_svg_ordered_dithering', ['--width=320']),
+    ('raster_to_svg_error_diffusion', ['--width=320']),
+]
+
+
+def run_effect(name, args, path):
+    module = imp.load_source(name, os.path.join(ROOT, 'Raster_to_SVG', name + '.py'))
+    effect = getattr(module, name)()
+    effect.affect(['--id=benchmark_image'] + args + [SOURCE], output=False)
+    effect.document.write(path)
+    return len(effect.document.getroot().xpath('//*'))
+
+
+def render_time(inkscape, path):
+    png = path[:-4] + '.png'
+    start = time.time()
+    subprocess.check_call([inkscape, '-z', path, '--export-png=' + png],
+                          stdout=open(os.devnull, 'w'), stderr=subprocess.STDOUT)
+    return time.time() - start
+
+
+def main(argv):
+    if not argv:
+        sys.exit(__doc__)
+    sys.path.insert(0, argv[0])
+    sys.path.insert(0, ROOT)
+    inkscape = argv[1] if len(argv) > 1 else None
+    workdir = tempfile.mkdtemp(prefix='halftone_benchmark_')
+    print '%-34s %-6s %10s %9s %9s' % ('effect', 'css', 'bytes', 'elements', 'render')
+    for name, args in EFFECTS:
+        for css in ('false', 'true'):
+            path = os.path.join(workdir, '%s_%s.svg' % (name, css))
+            elements = run_effect(name, args + ['--css=' + css], path)
+            render = '%.2fs' % render_time(inkscape, path) if inkscape else '-'
+            print '%-34s %-6s %10d %9d %9s' % (name, css, os.path.getsize(path), elements, render)
+    print 'outputs written to', workdir
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,58 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import numpy
+from PIL import Image
+
+
+class Bilevel(object):
+    '''A black and white image stored with 1 bit per pixel (numpy.packbits
+        along the rows, most significant bit first, 1 = white), which is the
+        raw layout of a PIL mode '1' image.'''
+
+    def __init__(self, packed, shape):
+        self.packed = packed
+        self.shape = tuple(shape)
+
+    @classmethod
+    def empty(cls, shape):
+        '''Returns an all black buffer of the given (height, width).'''
+        return cls(numpy.zeros((shape[0], (shape[1] + 7) // 8), dtype=numpy.uint8), shape)
+
+    @classmethod
+    def from_array(cls, data):
+        '''Packs a 2-D array, every non-zero pixel being white.'''
+        data = numpy.asarray(data)
+        return cls(numpy.packbits(data != 0, axis=1), data.shape)
+
+    def set_rows(self, start, data):
+        '''Packs the 2-D array data into the rows from start on.'''
+        data = numpy.asarray(data)
+        self.packed[start:start+len(data)] = numpy.packbits(data != 0, axis=1)
+
+    @property
+    def nbytes(self):
+        return self.packed.nbytes
+
+    def to_array(self):
+        '''Returns the image as a uint8 array of 0 and 255.'''
+        bits = numpy.unpackbits(self.packed, axis=1)[:, :self.shape[1]]
+        return bits * numpy.uint8(255)
+
+    def to_image(self):
+        '''Returns the image as a PIL mode '1' image without unpacking it.'''
+        height, width = self.shape
+        return Image.frombytes('1', (width, height), self.packed.tobytes())
@@ -0,0 +1,150 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import math
+
+import numpy
+
+
+def cell_origins(length, sample, origin=0):
+    '''Returns the start of every sample wide cell of a grid laid from
+        origin, that overlaps 0 .. length. The first cell may start before 0.'''
+    start = origin % sample
+    if start:
+        start -= sample
+    return numpy.arange(start, length, sample)
+
+
+def cell_sums(data, sample):
+    '''Returns the pixel sum of every sample x sample cell of a grid laid
+        from the top left corner of the 2-D array data, as an int64 array of
+        shape (rows, columns). Cells running over the right or bottom edge
+        are padded with zeros, like channel.crop() pads them.'''
+    data = numpy.asarray(data)
+    height, width = data.shape
+    rows = -(-height // sample)
+    columns = -(-width // sample)
+    padded = numpy.zeros((rows * sample, columns * sample), dtype=numpy.int64)
+    padded[:height, :width] = data
+    return padded.reshape(rows, sample, columns, sample).sum(axis=3).sum(axis=1)
+
+
+class SummedAreaTable(object):
+    '''Summed-area table of a 2-D array; the sum of any box is found with
+        four lookups, whatever its position. Boxes may run over the edges,
+        the pixels outside the array count as zeros.'''
+
+    def __init__(self, data):
+        data = numpy.asarray(data)
+        self.height, self.width = data.shape
+        self.table = numpy.zeros((self.height + 1, self.width + 1), dtype=numpy.int64)
+        self.table[1:, 1:] = data.cumsum(axis=0, dtype=numpy.int64).cumsum(axis=1)
+
+    def box_sums(self, xs, ys, width, height=None):
+        '''Returns the sums of the width x height boxes whose top left
+            corners are at xs, ys (integer arrays, broadcast together).'''
+        if height is None:
+            height = width
+        xs = numpy.asarray(xs)
+        ys = numpy.asarray(ys)
+        x0 = numpy.clip(xs, 0, self.width)
+        x1 = numpy.clip(xs + width, 0, self.width)
+        y0 = numpy.clip(ys, 0, self.height)
+        y1 = numpy.clip(ys + height, 0, self.height)
+        table = self.table
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+
+def cell_means(data, sample, origin=(0, 0)):
+    '''Returns the mean of every sample x sample cell of a grid laid from
+        origin (x, y), as a float array of shape (rows, columns). The mean is
+        taken over the whole cell, so the parts of the edge cells outside
+        the image count as zeros. The top left grid is reduced by reshaping,
+        any other origin goes through a summed-area table.'''
+    data = numpy.asarray(data)
+    if origin[0] % sample == 0 and origin[1] % sample == 0:
+        sums = cell_sums(data, sample)
+    else:
+        table = SummedAreaTable(data)
+        xs = cell_origins(data.shape[1], sample, origin[0])
+        ys = cell_origins(data.shape[0], sample, origin[1])
+        sums = table.box_sums(xs[numpy.newaxis, :], ys[:, numpy.newaxis], sample)
+    return sums / float(sample * sample)
+
+
+def dot_diameters(data, sample, origin=(0, 0)):
+    '''Returns the relative dot diameter (0 .. 1) of every cell of a
+        separation, the square root of its mean ink coverage, as an array
+        of shape (rows, columns). See cell_means for the grid.'''
+    means = cell_means(data, sample, origin)
+    # a cell can only take sample*sample*255+1 means; the roots go through
+    # a table of the distinct ones so they round exactly like mean**0.5 does
+    values, index = numpy.unique(means, return_inverse=True)
+    roots = numpy.array([(value / 255)**0.5 for value in values.tolist()])
+    return roots[index].reshape(means.shape)
+
+
+def channel_dots(channel, sample, scale):
+    '''Returns the centre and radius of every dot of one separation, given
+        as a 2-D uint8 array, drawn scale units a pixel. A module level
+        function, so channel_pool can send it to its worker processes.'''
+    channel = numpy.asarray(channel)
+    # the cells are listed column by column, x outer and y inner
+    diameter = dot_diameters(channel, sample).T
+    x = cell_origins(channel.shape[1], sample)[:, numpy.newaxis]
+    y = cell_origins(channel.shape[0], sample)[numpy.newaxis, :]
+    edge = 0.5*(1-diameter)
+    x_pos, y_pos = (x+edge)*scale, (y+edge)*scale
+    box_edge = sample*diameter*scale
+    return zip(((2*x_pos+box_edge)/2).ravel().tolist(),
+               ((2*y_pos+box_edge)/2).ravel().tolist(),
+               (box_edge-5).ravel().tolist())
+
+
+def rotated_lattice(size, sample, angle):
+    '''Returns the dot centres (xs, ys) of a screen of sample wide cells
+        turned by angle degrees about the centre of an image of size
+        (width, height), in image coordinates. Only the cells whose centre
+        lies within half a cell of the image are kept.'''
+    width, height = size
+    cos_a = math.cos(math.radians(angle))
+    sin_a = math.sin(math.radians(angle))
+    centre_x, centre_y = width / 2.0, height / 2.0
+    # the image corners in screen coordinates give the range of cells to visit
+    corners = [(x - centre_x, y - centre_y) for x in (0, width) for y in (0, height)]
+    us = [x * cos_a + y * sin_a for x, y in corners]
+    vs = [y * cos_a - x * sin_a for x, y in corners]
+    u = (numpy.arange(int(math.floor(min(us) / sample)) - 1,
+                      int(math.ceil(max(us) / sample)) + 1) + 0.5) * sample
+    v = (numpy.arange(int(math.floor(min(vs) / sample)) - 1,
+                      int(math.ceil(max(vs) / sample)) + 1) + 0.5) * sample
+    u, v = numpy.meshgrid(u, v)
+    xs = centre_x + u * cos_a - v * sin_a
+    ys = centre_y + u * sin_a + v * cos_a
+    margin = sample / 2.0
+    inside = ((xs > -margin) & (xs < width + margin) &
+              (ys > -margin) & (ys < height + margin))
+    return xs[inside], ys[inside]
+
+
+def lattice_diameters(data, xs, ys, sample):
+    '''Returns the relative dot diameter of the cells centred at xs, ys, each
+        sampled as the sample x sample box of data nearest to its centre.'''
+    table = SummedAreaTable(data)
+    x0 = numpy.floor(numpy.asarray(xs) - sample / 2.0 + 0.5).astype(int)
+    y0 = numpy.floor(numpy.asarray(ys) - sample / 2.0 + 0.5).astype(int)
+    means = table.box_sums(x0, y0, sample) / float(sample * sample)
+    return numpy.sqrt(means / 255)
@@ -0,0 +1,88 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import multiprocessing
+import traceback
+
+import numpy
+
+
+def _channel_worker(function, args, channel_args, shared, shape, tasks,
+                    results):
+    # pulls channel indices until it gets None, the pixel data is read
+    # straight out of the shared buffer
+    data = numpy.frombuffer(shared, dtype=numpy.uint8).reshape(shape)
+    while True:
+        index = tasks.get()
+        if index is None:
+            break
+        try:
+            result = function(data[index], *(channel_args[index] + args))
+            results.put((index, True, result))
+        except Exception:
+            results.put((index, False, traceback.format_exc()))
+
+
+def map_channels(function, channels, args=(), workers=None, channel_args=None):
+    '''Returns [function(channel, *args) for channel in channels], with the
+        channels handled by separate worker processes. channels are 2-D uint8
+        arrays (or 'L' images) of the same size; they are copied once into a
+        shared memory buffer instead of being pickled for every worker, only
+        the results travel back. function must be a module level function.
+        channel_args optionally gives a tuple of extra leading arguments for
+        every channel (e.g. its screen angle).
+        workers defaults to one per channel, limited to the number of CPU
+        cores; with a single worker everything runs in this process.'''
+    channels = [numpy.asarray(channel, dtype=numpy.uint8) for channel in channels]
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = max(1, min(workers, len(channels)))
+    if channel_args is None:
+        channel_args = [()] * len(channels)
+    channel_args = [tuple(extra) for extra in channel_args]
+    if workers == 1:
+        return [function(channel, *(extra + args))
+                for channel, extra in zip(channels, channel_args)]
+    shape = (len(channels),) + channels[0].shape
+    shared = multiprocessing.RawArray('B', int(numpy.prod(shape)))
+    numpy.frombuffer(shared, dtype=numpy.uint8).reshape(shape)[:] = channels
+    tasks = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    for index in range(len(channels)):
+        tasks.put(index)
+    for _ in range(workers):
+        tasks.put(None)
+    # plain processes rather than a Pool: pool workers are daemonic and could
+    # not start the wavefront workers of a channel themselves
+    pool = [multiprocessing.Process(target=_channel_worker,
+                                    args=(function, args, channel_args, shared,
+                                          shape, tasks, results))
+            for _ in range(workers)]
+    for process in pool:
+        process.start()
+    merged = [None] * len(channels)
+    errors = []
+    for _ in range(len(channels)):
+        index, ok, result = results.get()
+        if ok:
+            merged[index] = result
+        else:
+            errors.append(result)
+    for process in pool:
+        process.join()
+    if errors:
+        raise RuntimeError('channel worker failed:\n' + errors[0])
+    return merged
@@ -0,0 +1,54 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import re
+
+import numpy
+
+_TRAILING_ZERO = re.compile(r'\.0$', re.M)
+_LEADING_ZERO = re.compile(r'^(-?)0\.', re.M)
+_COMMA_MINUS = re.compile(r',(?=-)')
+
+
+def compact(values, precision=None):
+    '''Formats an array of numbers as short strings, all in one go rather
+        than a str() per number: rounded to precision decimals (None keeps
+        them all), without a trailing ".0", a leading "0" before the point
+        or a sign on zero. Returns a list of strings.'''
+    values = numpy.asarray(values)
+    if values.dtype.kind in 'biu':
+        return map(str, values.tolist())
+    if precision is not None:
+        # adding 0.0 turns -0.0 into 0.0
+        values = numpy.round(values, precision) + 0.0
+    text = '\n'.join(map(repr, values.tolist()))
+    text = _LEADING_ZERO.sub(r'\1.', _TRAILING_ZERO.sub('', text))
+    return text.split('\n') if text else []
+
+
+def compact_dots(dots, precision=None):
+    '''Formats a list of (x, y, radius) dots with compact(), returning the
+        same list of tuples with strings for numbers.'''
+    if not len(dots):
+        return []
+    xs, ys, radii = numpy.asarray(dots, dtype=float).T
+    return zip(compact(xs, precision), compact(ys, precision), compact(radii, precision))
+
+
+def compact_path(d):
+    '''Drops the commas a path data string does not need: a minus sign
+        already separates two numbers.'''
+    return _COMMA_MINUS.sub('', d)
@@ -0,0 +1,154 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import numpy
+
+from halftone_lib import kernels
+
+
+def clip_trunc(values):
+    '''Truncates towards zero and clamps to 0..255, which is what writing an
+        int() into an 'L' image through PixelAccess does.'''
+    return numpy.clip(numpy.trunc(values), 0, 255)
+
+
+def _forward_loop(forward):
+    # Returns a function thresholding one row and spreading the error along
+    # it. row holds the error (or the pixel values, with base all zero) and
+    # is overwritten with the 0/255 result. The one and two tap cases are
+    # written out so that kernels with few taps on the current row do not
+    # pay for a generic inner tap loop.
+    if len(forward) == 1:
+        (dx1, w1), = forward
+
+        def spread(base, row, err, start, stop, clamp):
+            for x in range(start, stop):
+                value = base[x] + row[x]
+                new = 255 if value >= 128 else 0
+                row[x] = new
+                diffused_error = value - new
+                err[x] = diffused_error
+                value = row[x+dx1] + w1 * diffused_error
+                if clamp:
+                    value = int(value)
+                    value = 0 if value < 0 else (255 if value > 255 else value)
+                row[x+dx1] = value
+        return spread
+    if len(forward) == 2:
+        (dx1, w1), (dx2, w2) = forward
+
+        def spread(base, row, err, start, stop, clamp):
+            for x in range(start, stop):
+                value = base[x] + row[x]
+                new = 255 if value >= 128 else 0
+                row[x] = new
+                diffused_error = value - new
+                err[x] = diffused_error
+                first = row[x+dx1] + w1 * diffused_error
+                second = row[x+dx2] + w2 * diffused_error
+                if clamp:
+                    first = int(first)
+                    first = 0 if first < 0 else (255 if first > 255 else first)
+                    second = int(second)
+                    second = 0 if second < 0 else (255 if second > 255 else second)
+                row[x+dx1] = first
+                row[x+dx2] = second
+        return spread
+
+    def spread(base, row, err, start, stop, clamp):
+        for x in range(start, stop):
+            value = base[x] + row[x]
+            new = 255 if value >= 128 else 0
+            row[x] = new
+            diffused_error = value - new
+            err[x] = diffused_error
+            for dx, weight in forward:
+                value = row[x+dx] + weight * diffused_error
+                if clamp:
+                    value = int(value)
+                    value = 0 if value < 0 else (255 if value > 255 else value)
+                row[x+dx] = value
+    return spread
+
+
+def _spread_below(rows, y, offset, width, err, kernel, clamp):
+    # adds the error of row y to the following rows, one array operation
+    # per tap; rows[y+dy][offset+p] receives weight * err[p-dx]
+    for dy, taps in kernel.below:
+        target = rows[y+dy]
+        for dx, weight in taps:
+            if dx >= 0:
+                values = target[offset+dx:offset+width] + weight * err[:width-dx]
+                if clamp:
+                    values = clip_trunc(values)
+                target[offset+dx:offset+width] = values
+            else:
+                values = target[offset:offset+width+dx] + weight * err[-dx:]
+                if clamp:
+                    values = clip_trunc(values)
+                target[offset:offset+width+dx] = values
+
+
+def scanline_diffuse(data, kernel=kernels.FLOYD_STEINBERG):
+    '''Error diffusion of a 2-D uint8 array with clamped integer error, one
+        row at a time.
+        The error pushed along the row is carried through the row itself, the
+        error pushed to later rows is kept in a single row buffer and added
+        with one array operation per tap once the row is done. Every
+        intermediate value is truncated and clamped to 0..255 in the same
+        order as the old per pixel PixelAccess loop, so for Floyd-Steinberg
+        the output is identical to it (including the untouched border that
+        the kernel cannot reach into).'''
+    out = numpy.array(data, dtype=numpy.float64)
+    height, width = out.shape
+    reach = kernel.reach
+    if height <= kernel.depth or width <= 2 * reach:
+        return out.astype(numpy.uint8)
+    spread = _forward_loop(kernel.forward)
+    base = [0] * width
+    for y in range(height - kernel.depth):
+        row = out[y].astype(numpy.int64).tolist()
+        err = [0] * width
+        spread(base, row, err, reach, width - reach, True)
+        out[y] = row
+        _spread_below(out, y, 0, width, numpy.array(err, dtype=numpy.float64),
+                      kernel, True)
+    return out.astype(numpy.uint8)
+
+
+def error_diffuse(data, kernel=kernels.FLOYD_STEINBERG):
+    '''Error diffusion of a 2-D array with the error kept as float, the way
+        the raster to svg and svg to svg extensions do it: a pixel becomes 255
+        when its value plus the error reaching it is at least 128, error that
+        would leave the image is dropped. Returns a uint8 array of 0 and 255.
+        The error buffer is padded by the kernel reach so no bounds checks
+        are needed.'''
+    data = numpy.asarray(data, dtype=numpy.float64)
+    height, width = data.shape
+    reach = kernel.reach
+    buf = numpy.zeros((height + kernel.depth, width + 2 * reach))
+    out = numpy.zeros((height, width), dtype=numpy.uint8)
+    spread = _forward_loop(kernel.forward)
+    pad = [0.0] * reach
+    for y in range(height):
+        base = pad + data[y].tolist() + pad
+        row = buf[y].tolist()
+        err = [0.0] * (width + 2 * reach)
+        spread(base, row, err, reach, reach + width, False)
+        out[y] = row[reach:reach+width]
+        _spread_below(buf, y, reach, width,
+                      numpy.array(err[reach:reach+width]), kernel, False)
+    return out
@@ -0,0 +1,139 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import os
+import hashlib
+import tempfile
+
+from lxml import etree
+
+DEFAULT_SIZE = 256 * 1024 * 1024
+SUFFIX = '.png'
+
+NAMEDVIEW = '{http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd}namedview'
+METADATA = '{http://www.w3.org/2000/svg}metadata'
+# the namedview attributes Inkscape paints the background of an export with
+BACKGROUND = ['pagecolor', '{http://www.inkscape.org/namespaces/inkscape}pageopacity']
+
+
+def drawing(svg_path):
+    '''Returns the SVG file as a string without what does not change how it
+        renders: its metadata and sodipodi:namedview (zoom, window, current
+        layer...), but for the page colour and opacity exports are painted on.'''
+    root = etree.parse(svg_path).getroot()
+    background = []
+    for namedview in root.findall(NAMEDVIEW):
+        background.extend(namedview.get(name, '') for name in BACKGROUND)
+        root.remove(namedview)
+    for metadata in root.findall(METADATA):
+        root.remove(metadata)
+    return etree.tostring(root) + '\0'.join(background)
+
+
+def export_key(svg_path, renderer, area=None, width=None):
+    '''Returns the cache key of one export: a hash of the drawing of the
+        SVG file and of what is exported from it (the page or area, at width
+        pixels or 96 dpi). The whole drawing is hashed rather than only the
+        exported object, since an export also shows whatever else overlaps
+        the object and the definitions it uses.'''
+    digest = hashlib.sha1(drawing(svg_path))
+    if area is not None:
+        area = '%r:%r:%r:%r' % tuple(area)
+    digest.update('\0%s\0%s\0%s' % (renderer, area or '', width or 96))
+    return digest.hexdigest()
+
+
+class ExportCache(object):
+    '''Rasterized exports kept as PNG files named by their key in directory,
+        at most max_bytes of them: the least recently used are removed when
+        a new one does not fit (a hit touches the file's modification time).
+        hits and misses count the lookups of this instance.'''
+
+    def __init__(self, directory, max_bytes=DEFAULT_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        '''Returns the PNG stored under key as a string, or None.'''
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as cached:
+                data = cached.read()
+            os.utime(path, None)
+        except (IOError, OSError):
+            # not cached, or evicted by another run meanwhile
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        '''Stores the PNG data under key, then evicts down to max_bytes.'''
+        if len(data) > self.max_bytes:
+            return
+        # written aside and renamed, so other runs never read half a file
+        handle, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        with os.fdopen(handle, 'wb') as temp:
+            temp.write(data)
+        try:
+            os.rename(temp_path, self.path(key))
+        except OSError:
+            # Windows does not rename over a file another run just stored
+            os.remove(temp_path)
+        self.evict()
+
+    def entries(self):
+        '''Returns (mtime, size, path) of every cached export, oldest first.'''
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.evicted += 1
+            except OSError:
+                pass
+            total -= size
+
+    def report(self):
+        '''Returns a one line summary of the lookups and the cache size.'''
+        entries = self.entries()
+        return ('export cache %s: %d hits, %d misses, %d evicted, %d exports in %d of %d bytes'
+                % (self.directory, self.hits, self.misses, self.evicted, len(entries),
+                   sum(size for _, size, _ in entries), self.max_bytes))
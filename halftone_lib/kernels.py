@@ -0,0 +1,84 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+
+class Kernel(object):
+    '''An error diffusion kernel. taps is a list of (dx, dy, weight) relative
+        to the current pixel, the weights are divided by divisor. The taps are
+        compiled once into an offset/weight table: the taps of the current
+        row (applied pixel by pixel) and, for every later row, the taps of
+        that row ordered so that adding them one after another matches the
+        order a pixel by pixel loop would add them in.'''
+
+    def __init__(self, name, divisor, taps):
+        self.name = name
+        self.divisor = divisor
+        self.taps = taps
+        self.forward = tuple((dx, weight / float(divisor))
+                             for dx, dy, weight in sorted(taps) if dy == 0)
+        self.depth = max(dy for dx, dy, weight in taps)
+        self.reach = max(abs(dx) for dx, dy, weight in taps)
+        below = []
+        for row in range(1, self.depth + 1):
+            row_taps = sorted(((dx, weight / float(divisor))
+                               for dx, dy, weight in taps if dy == row),
+                              reverse=True)
+            below.append((row, tuple(row_taps)))
+        self.below = tuple(below)
+
+    def __repr__(self):
+        return 'Kernel(%r, %d taps)' % (self.name, len(self.taps))
+
+
+def _row(dy, weights):
+    # weights are given left to right, centred on the current pixel
+    half = len(weights) // 2
+    return [(dx - half, dy, weight) for dx, weight in enumerate(weights) if weight]
+
+
+FLOYD_STEINBERG = Kernel('floyd-steinberg', 16,
+                         [(1, 0, 7)] + _row(1, [3, 5, 1]))
+JARVIS = Kernel('jarvis', 48,
+                [(1, 0, 7), (2, 0, 5)] + _row(1, [3, 5, 7, 5, 3]) +
+                _row(2, [1, 3, 5, 3, 1]))
+STUCKI = Kernel('stucki', 42,
+                [(1, 0, 8), (2, 0, 4)] + _row(1, [2, 4, 8, 4, 2]) +
+                _row(2, [1, 2, 4, 2, 1]))
+BURKES = Kernel('burkes', 32,
+                [(1, 0, 8), (2, 0, 4)] + _row(1, [2, 4, 8, 4, 2]))
+SIERRA = Kernel('sierra', 32,
+                [(1, 0, 5), (2, 0, 3)] + _row(1, [2, 4, 5, 4, 2]) +
+                _row(2, [0, 2, 3, 2, 0]))
+SIERRA_TWO_ROW = Kernel('sierra-two-row', 16,
+                        [(1, 0, 4), (2, 0, 3)] + _row(1, [1, 2, 3, 2, 1]))
+SIERRA_LITE = Kernel('sierra-lite', 4,
+                     [(1, 0, 2), (-1, 1, 1), (0, 1, 1)])
+ATKINSON = Kernel('atkinson', 8,
+                  [(1, 0, 1), (2, 0, 1)] + _row(1, [1, 1, 1]) + [(0, 2, 1)])
+
+KERNELS = dict((kernel.name, kernel) for kernel in (
+    FLOYD_STEINBERG, JARVIS, STUCKI, BURKES, SIERRA, SIERRA_TWO_ROW,
+    SIERRA_LITE, ATKINSON))
+
+
+def get_kernel(name):
+    '''Returns the registered kernel called name (case insensitive, spaces
+        and underscores may be used instead of dashes).'''
+    key = name.lower().replace('_', '-').replace(' ', '-')
+    if key not in KERNELS:
+        raise KeyError('Unknown diffusion kernel %r, choose one of %s'
+                       % (name, ', '.join(sorted(KERNELS))))
+    return KERNELS[key]
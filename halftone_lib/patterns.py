@@ -0,0 +1,106 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import numpy
+
+from halftone_lib import bilevel, threshold
+
+
+class PatternSet(object):
+    '''A set of n x n bilevel tiles, one per intensity level, tile 0 being
+        the blackest. tiles is an array of shape (levels, n, n) holding 0 and
+        255.'''
+
+    def __init__(self, name, tiles):
+        self.name = name
+        self.tiles = numpy.asarray(tiles, dtype=numpy.uint8)
+        self.levels, self.size = self.tiles.shape[:2]
+
+    @classmethod
+    def from_order(cls, name, order):
+        '''Builds the n*n+1 tiles of a nested pattern set: order gives, for
+            every cell of the tile, the level index (0 .. n*n-1) at which
+            the cell turns white.'''
+        order = numpy.asarray(order)
+        levels = numpy.arange(order.size + 1).reshape(-1, 1, 1)
+        return cls(name, numpy.where(order < levels, 255, 0))
+
+    def expand(self, data):
+        '''Maps every pixel of a 2-D array to the tile of its intensity level,
+            with one lookup table gather. Returns a uint8 array n times the
+            size of data in each direction.'''
+        data = numpy.asarray(data)
+        height, width = data.shape
+        blocks = self.tiles[threshold.quantize(data, self.levels)]
+        return blocks.transpose(0, 2, 1, 3).reshape(height * self.size,
+                                                    width * self.size)
+
+    def expand_bilevel(self, data, band=64):
+        '''Same as expand, packed into a 1 bit per pixel bilevel.Bilevel.
+            The blocks are expanded band rows of data at a time, so the
+            unpacked output never exists as a whole.'''
+        data = numpy.asarray(data)
+        height, width = data.shape
+        levels = threshold.quantize(data, self.levels)
+        out = bilevel.Bilevel.empty((height * self.size, width * self.size))
+        for start in range(0, height, band):
+            blocks = self.tiles[levels[start:start+band]]
+            rows = len(blocks)
+            out.set_rows(start * self.size,
+                         blocks.transpose(0, 2, 1, 3).reshape(rows * self.size,
+                                                              width * self.size))
+        return out
+
+
+#  ---   ---   ---   -X-   -XX   -XX   -XX   -XX   XXX   XXX
+#  ---   -X-   -XX   -XX   -XX   -XX   XXX   XXX   XXX   XXX
+#  ---   ---   ---   ---   ---   -X-   -X-   XX-   XX-   XXX
+#  9     8     7     6     5     4     3     2     1     0
+#  X = 0
+#  - = 255
+#  Therefore intensity 0 being the blackest block.
+CLASSIC = PatternSet('classic', [
+    [[0, 0, 0], [0, 0, 0], [0, 0, 0]],
+    [[0, 255, 0], [0, 0, 0], [0, 0, 0]],
+    [[0, 255, 0], [0, 0, 0], [0, 0, 255]],
+    [[255, 255, 0], [0, 0, 0], [0, 0, 255]],
+    [[255, 255, 0], [0, 0, 0], [255, 0, 255]],
+    [[255, 255, 255], [0, 0, 0], [255, 0, 255]],
+    [[255, 255, 255], [0, 0, 255], [255, 0, 255]],
+    [[255, 255, 255], [0, 0, 255], [255, 255, 255]],
+    [[255, 255, 255], [255, 0, 255], [255, 255, 255]],
+    [[255, 255, 255], [255, 255, 255], [255, 255, 255]]])
+
+_SETS = {('classic', 3): CLASSIC}
+
+
+def get_pattern_set(name='classic', size=3):
+    '''Returns the (cached) pattern set of the given kind and size:
+        'classic' (3x3 only), or a nested set grown in 'bayer' (size a power
+        of two) or 'clustered' dot order.'''
+    key = (name, size)
+    if name == 'classic':
+        key = ('classic', 3)
+    if key not in _SETS:
+        if name == 'bayer':
+            order = threshold.bayer_matrix(size)
+        elif name == 'clustered':
+            order = threshold.clustered_matrix(size)
+        else:
+            raise KeyError('Unknown pattern set %r, choose classic, bayer '
+                           'or clustered' % name)
+        _SETS[key] = PatternSet.from_order('%s-%d' % (name, size), order)
+    return _SETS[key]
@@ -0,0 +1,56 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import os
+import struct
+
+SIGNATURE = '\x89PNG\r\n\x1a\n'
+# Inkscape 0.92 writes its PNG straight to a pipe when exported to this path
+# (there is no such file on Windows, where a temporary file is still needed)
+PIPE_PATH = '/dev/stdout'
+
+
+def supported():
+    '''Says whether Inkscape can export to PIPE_PATH here.'''
+    return os.name != 'nt'
+
+
+def png_end(data, start):
+    '''Returns the offset just past the IEND chunk of the PNG starting at
+        start in data, or None if data ends before it.'''
+    position = start + len(SIGNATURE)
+    while position + 8 <= len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        # length, type, data and CRC
+        position += 12 + length
+        if kind == 'IEND':
+            return position if position <= len(data) else None
+    return None
+
+
+def split_output(data):
+    '''Splits what Inkscape wrote to stdout when exporting to PIPE_PATH into
+        (png, text): the PNG file, wherever it lies between its messages
+        ("Background RRGGBBAA...", "Bitmap saved as..."), and those messages.
+        png is None if data holds no PNG, and text None if the PNG is not
+        complete yet.'''
+    start = data.find(SIGNATURE)
+    if start < 0:
+        return None, data
+    end = png_end(data, start)
+    if end is None:
+        return data[start:], None
+    return data[start:end], data[:start] + data[end:]
@@ -0,0 +1,264 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import os
+import re
+import subprocess
+import StringIO
+
+from lxml import etree
+from PIL import Image
+import simpletransform
+
+from halftone_lib import export_cache, png_pipe, shell_pool
+
+try:
+    import cairosvg
+except ImportError:
+    cairosvg = None
+
+
+# px per unit of the lengths in the width and height of the root
+UNITS = {'': 1.0, 'px': 1.0, 'pt': 4.0 / 3.0, 'pc': 16.0, 'mm': 96.0 / 25.4, 'cm': 96.0 / 2.54,
+         'in': 96.0}
+
+
+def root_transform(node):
+    '''Returns the transform from the coordinates of the children of node
+        to the user units of the root of its document.'''
+    mat = simpletransform.parseTransform(node.get('transform'))
+    for ancestor in node.iterancestors():
+        mat = simpletransform.composeTransform(simpletransform.parseTransform(ancestor.get('transform')), mat)
+    return mat
+
+
+def node_area(node):
+    '''Returns the geometric bounding box (x0, y0, x1, y1) of node in the
+        user units of the root of its document, with its own and its
+        ancestors' transforms applied, or None if it has no area
+        simpletransform can measure (e.g. text).'''
+    bbox = simpletransform.computeBBox([node], root_transform(node.getparent()))
+    if bbox is None or bbox[1] <= bbox[0] or bbox[3] <= bbox[2]:
+        return None
+    xmin, xmax, ymin, ymax = bbox
+    return xmin, ymin, xmax, ymax
+
+
+def area_transform(area, width, parent=None, origin=0):
+    '''Returns the transform that lays a drawing width user units wide,
+        with its top left corner at (origin, origin), over area: a bitmap
+        drawn at one unit a pixel from the origin, or the dither effects'
+        dot grid, two units a pixel centred on (2j, 2i), with twice its
+        width and an origin of -1. A child of parent is drawn in parent's
+        coordinates, so their transform is undone.'''
+    x0, y0, x1, y1 = area
+    scale = (x1 - x0) / float(width)
+    x0, y0 = x0 - origin * scale, y0 - origin * scale
+    if parent is None:
+        return 'translate(%r,%r) scale(%r)' % (x0, y0, scale)
+    mat = simpletransform.composeTransform(simpletransform.invertTransform(root_transform(parent)),
+                                           [[scale, 0.0, x0], [0.0, scale, y0]])
+    (a, c, e), (b, d, f) = mat
+    if b == 0 and c == 0 and a == d:
+        return 'translate(%r,%r) scale(%r)' % (e, f, a)
+    return 'matrix(%r,%r,%r,%r,%r,%r)' % (a, b, c, d, e, f)
+
+
+def length(value, default):
+    '''Returns the length value (e.g. '210mm') in px, or default.'''
+    match = re.match(r'\s*([-+]?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?)\s*([a-z]*)\s*$', value or '')
+    if match is None or match.group(2) not in UNITS:
+        return default
+    return float(match.group(1)) * UNITS[match.group(2)]
+
+
+def export_area(root, area):
+    '''Returns area, in the user units of root, as Inkscape 0.92's
+        --export-area x0:y0:x1:y1: in px with the origin at the bottom left
+        corner of the page.'''
+    viewbox = [float(value) for value in re.split(r'[\s,]+', root.get('viewBox', '').strip()) if value]
+    if len(viewbox) == 4 and viewbox[2] > 0 and viewbox[3] > 0:
+        scale_x = length(root.get('width'), viewbox[2]) / viewbox[2]
+        scale_y = length(root.get('height'), viewbox[3]) / viewbox[3]
+        height = viewbox[3] * scale_y
+    else:
+        viewbox = [0.0, 0.0]
+        scale_x = scale_y = 1.0
+        height = length(root.get('height'), area[3])
+    x0, y0, x1, y1 = area
+    x0, x1 = (x0 - viewbox[0]) * scale_x, (x1 - viewbox[0]) * scale_x
+    y0, y1 = (y0 - viewbox[1]) * scale_y, (y1 - viewbox[1]) * scale_y
+    return '%r:%r:%r:%r' % (x0, height - y1, x1, height - y0)
+
+
+def cropped_document(svg_path, area, width=None):
+    '''Returns the SVG file as a string, its page cut down to area and
+        width pixels wide (one pixel a user unit by default).'''
+    document = etree.parse(svg_path)
+    root = document.getroot()
+    x0, y0, x1, y1 = area
+    if not width:
+        width = int(round(x1 - x0))
+    height = max(1, int(round(width * (y1 - y0) / (x1 - x0))))
+    root.set('width', '%dpx' % width)
+    root.set('height', '%dpx' % height)
+    root.set('viewBox', '%r %r %r %r' % (x0, y0, x1 - x0, y1 - y0))
+    root.set('preserveAspectRatio', 'none')
+    return etree.tostring(document)
+
+
+class Renderer(object):
+    '''Rasterizes an SVG file for the SVG to SVG effects. Subclasses set
+        name, say with available() whether they can run here and return the
+        PNG file as a string from render_png(): the whole page, or given a
+        node of the document only its node_area, width pixels wide if given.
+        render() returns it as a PIL image.'''
+
+    name = None
+
+    def __init__(self, inkscape_path='', temp_path=''):
+        self.inkscape_path = inkscape_path
+        self.temp_path = temp_path
+
+    @classmethod
+    def available(cls, inkscape_path='', temp_path=''):
+        return True
+
+    def render_png(self, svg_path, node=None, width=None):
+        raise NotImplementedError
+
+    def render(self, svg_path, node=None, width=None):
+        return Image.open(StringIO.StringIO(self.render_png(svg_path, node, width)))
+
+
+class InkscapeRenderer(Renderer):
+    '''Exports the page with a new Inkscape process, reading the PNG from
+        its stdout pipe, so no file is written and runs at the same time
+        cannot clobber each other's bitmap. Where there is no png_pipe
+        (Windows) it goes through the PNG file temp_path instead.'''
+
+    name = 'inkscape'
+
+    @classmethod
+    def available(cls, inkscape_path='', temp_path=''):
+        return bool(inkscape_path and (temp_path or png_pipe.supported()))
+
+    def render_png(self, svg_path, node=None, width=None):
+        piped = png_pipe.supported()
+        target = png_pipe.PIPE_PATH if piped else self.temp_path
+        if not piped and os.path.exists(self.temp_path):
+            # so a failed export is not mistaken for the last one
+            os.remove(self.temp_path)
+        # an argument list, not a shell command: paths may hold spaces
+        command = [self.inkscape_path, svg_path, '--export-png=%s' % target]
+        if node is not None:
+            # the geometric bounding box of node_area, where --export-id
+            # would take in the stroke
+            command.append('--export-area=%s' % export_area(node.getroottree().getroot(), node_area(node)))
+        if width:
+            command.append('--export-width=%d' % width)
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as error:
+            raise RuntimeError('Could not run Inkscape (%s): %s' % (self.inkscape_path, error))
+        output, errors = process.communicate()
+        if not piped:
+            if not os.path.exists(self.temp_path):
+                raise RuntimeError('Inkscape exported no PNG:\n%s' % (errors or output))
+            with open(self.temp_path, 'rb') as exported:
+                return exported.read()
+        png, text = png_pipe.split_output(output)
+        if not png or text is None:
+            raise RuntimeError('Inkscape exported no PNG:\n%s' % (errors or output))
+        return png
+
+
+class InkscapeShellRenderer(Renderer):
+    '''Exports the page with the long-lived Inkscape shell processes of the
+        shared_pool of inkscape_path. The start-up time is paid once per
+        worker of the pool, not once per export; worth it when one process
+        runs the effect on many documents (see svg_to_svg_batch.py).'''
+
+    name = 'inkscape-shell'
+
+    @classmethod
+    def available(cls, inkscape_path='', temp_path=''):
+        return bool(inkscape_path)
+
+    def render_png(self, svg_path, node=None, width=None):
+        area = None
+        if node is not None:
+            area = export_area(node.getroottree().getroot(), node_area(node))
+        return shell_pool.shared_pool(self.inkscape_path).export(svg_path, area, width)
+
+
+class CairoSVGRenderer(Renderer):
+    '''Rasterizes the page in this process with CairoSVG (at Inkscape's
+        96 dpi), without starting Inkscape or writing a file.'''
+
+    name = 'cairosvg'
+
+    @classmethod
+    def available(cls, inkscape_path='', temp_path=''):
+        return cairosvg is not None
+
+    def render_png(self, svg_path, node=None, width=None):
+        if node is None:
+            return cairosvg.svg2png(url=svg_path, dpi=96)
+        return cairosvg.svg2png(bytestring=cropped_document(svg_path, node_area(node), width), dpi=96)
+
+
+class CachedRenderer(Renderer):
+    '''Wraps a renderer with an export_cache.ExportCache: an export already
+        made of the same file, by the same kind of renderer, is read back
+        from the cache instead of being rendered again. The PNG the renderer
+        made is stored as it is, not decoded and encoded again.'''
+
+    def __init__(self, renderer, cache):
+        self.renderer = renderer
+        self.cache = cache
+        self.name = renderer.name
+
+    def render_png(self, svg_path, node=None, width=None):
+        area = node_area(node) if node is not None else None
+        key = export_cache.export_key(svg_path, self.renderer.name, area, width)
+        png = self.cache.get(key)
+        if png is None:
+            png = self.renderer.render_png(svg_path, node, width)
+            self.cache.put(key, png)
+        return png
+
+
+# in order of preference for 'auto'
+RENDERERS = [CairoSVGRenderer, InkscapeRenderer, InkscapeShellRenderer]
+
+
+def get_renderer(name, inkscape_path='', temp_path=''):
+    '''Returns the renderer called name, or for 'auto' the first of RENDERERS
+        available here.'''
+    if name == 'auto':
+        for renderer in RENDERERS:
+            if renderer.available(inkscape_path, temp_path):
+                return renderer(inkscape_path, temp_path)
+        raise RuntimeError('No renderer available: install CairoSVG, or give the '
+                           'inkscape path (and on Windows a temporary path)')
+    for renderer in RENDERERS:
+        if renderer.name == name:
+            if not renderer.available(inkscape_path, temp_path):
+                raise RuntimeError('The %s renderer is not available here' % name)
+            return renderer(inkscape_path, temp_path)
+    raise KeyError('Unknown renderer %r, choose auto, %s'
+                   % (name, ', '.join(renderer.name for renderer in RENDERERS)))
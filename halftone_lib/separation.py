@@ -0,0 +1,34 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import numpy
+from PIL import Image
+
+
+def gcr(im, percentage):
+    '''basic "Gray Component Replacement" function. Returns a CMYK image with
+        percentage gray component removed from the CMY channels and put in the
+        K channel, ie. for percentage=100, (41, 100, 255, 0) >> (0, 59, 214, 41)
+        The gray component is computed for the whole image at once.'''
+    cmyk_im = im.convert('CMYK')
+    if not percentage:
+        return cmyk_im
+    cmyk = numpy.array(cmyk_im, dtype=numpy.int32)
+    gray = cmyk[:, :, :3].min(axis=2) * percentage // 100
+    gray = numpy.clip(gray, 0, 255)
+    cmyk[:, :, :3] -= gray[:, :, numpy.newaxis]
+    cmyk[:, :, 3] = gray
+    return Image.fromarray(numpy.clip(cmyk, 0, 255).astype(numpy.uint8), 'CMYK')
@@ -0,0 +1,201 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import os
+import pipes
+import Queue
+import atexit
+import tempfile
+import threading
+import subprocess
+
+from halftone_lib import png_pipe
+
+PROMPT = '>'
+
+
+def export_command(svg_path, png_path, area=None, width=None):
+    '''Returns the line that exports svg_path to png_path (a file or
+        png_pipe.PIPE_PATH) in Inkscape's shell mode: the whole page, or only
+        area (an --export-area x0:y0:x1:y1), width pixels wide if given. The
+        shell splits the line like a command line, so each argument is
+        quoted.'''
+    arguments = [svg_path, '--export-png=%s' % png_path]
+    if area is not None:
+        arguments.append('--export-area=%s' % area)
+    if width:
+        arguments.append('--export-width=%d' % width)
+    return ' '.join(pipes.quote(argument) for argument in arguments)
+
+
+class ShellWorker(object):
+    '''One Inkscape process in shell mode (inkscape --shell), started once
+        and then fed export commands one line at a time, so the start-up
+        time is paid once for all its exports. The PNGs come back over its
+        stdout pipe, or where there is no png_pipe through a temporary file
+        of the worker's own.'''
+
+    def __init__(self, inkscape_path):
+        try:
+            self.process = subprocess.Popen([inkscape_path, '--shell'],
+                                            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            stderr=open(os.devnull, 'w'))
+        except OSError as error:
+            raise RuntimeError('Could not run Inkscape (%s): %s' % (inkscape_path, error))
+        self.temp_path = None
+        if not png_pipe.supported():
+            handle, self.temp_path = tempfile.mkstemp(suffix='.png')
+            os.close(handle)
+        self.read_prompt()
+
+    def read_prompt(self):
+        '''Returns (png, text): the PNG Inkscape wrote to its stdout, if any,
+            and the rest of what it printed up to its next prompt.'''
+        output = ''
+        while True:
+            png, text = png_pipe.split_output(output)
+            # a prompt inside the PNG bytes does not count
+            if text is not None and (text == PROMPT or text.endswith('\n' + PROMPT)):
+                return png, text[:-len(PROMPT)]
+            data = os.read(self.process.stdout.fileno(), 65536)
+            if not data:
+                raise RuntimeError('The Inkscape shell exited (status %s)' % self.process.wait())
+            output += data
+
+    def run(self, line):
+        '''Runs one shell command and returns read_prompt().'''
+        self.process.stdin.write(line + '\n')
+        self.process.stdin.flush()
+        return self.read_prompt()
+
+    def export(self, svg_path, area=None, width=None):
+        '''Returns the PNG file of svg_path as a string, see export_command.'''
+        if self.temp_path is None:
+            png, text = self.run(export_command(svg_path, png_pipe.PIPE_PATH, area, width))
+        else:
+            if os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
+            png, text = self.run(export_command(svg_path, self.temp_path, area, width))
+            if os.path.exists(self.temp_path):
+                with open(self.temp_path, 'rb') as exported:
+                    png = exported.read()
+        if not png:
+            raise RuntimeError('The Inkscape shell exported no PNG:\n%s' % text)
+        return png
+
+    def close(self):
+        if self.temp_path is not None and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.write('quit\n')
+                self.process.stdin.close()
+            except IOError:
+                pass
+            self.process.wait()
+
+
+class WorkerPool(object):
+    '''Up to size ShellWorkers of inkscape_path, started as they are first
+        needed. export() may be called from several threads at once: each
+        call takes an idle worker, or waits for one, and gives it back when
+        done. A worker whose Inkscape exits is dropped and replaced by a new
+        one on a later call.'''
+
+    def __init__(self, inkscape_path, size=1):
+        self.inkscape_path = inkscape_path
+        self.size = max(1, size)
+        self.idle = Queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+        self.exports = 0
+
+    def acquire(self):
+        with self.lock:
+            if self.idle.empty() and len(self.workers) < self.size:
+                # reserve the place before the slow start, outside the lock
+                self.workers.append(None)
+                start = True
+            else:
+                start = False
+        if not start:
+            return self.idle.get()
+        try:
+            worker = ShellWorker(self.inkscape_path)
+        except Exception:
+            with self.lock:
+                self.workers.remove(None)
+            raise
+        with self.lock:
+            self.workers[self.workers.index(None)] = worker
+        return worker
+
+    def export(self, svg_path, area=None, width=None):
+        '''Returns the PNG file of svg_path as a string, exported by the next
+            idle worker, see export_command.'''
+        worker = self.acquire()
+        try:
+            png = worker.export(svg_path, area, width)
+        except Exception:
+            if worker.process.poll() is None:
+                # a failed export, e.g. a missing file: the shell is still fine
+                self.idle.put(worker)
+            else:
+                worker.close()
+                with self.lock:
+                    self.workers.remove(worker)
+            raise
+        with self.lock:
+            self.exports += 1
+        self.idle.put(worker)
+        return png
+
+    def close(self):
+        '''Quits every worker; the pool starts new ones if used again.'''
+        with self.lock:
+            workers = [worker for worker in self.workers if worker is not None]
+            self.workers = [worker for worker in self.workers if worker is None]
+            self.idle = Queue.Queue()
+        for worker in workers:
+            worker.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def shared_pool(inkscape_path, size=None):
+    '''Returns the pool of inkscape_path shared by every renderer of this
+        process, creating it with size workers (default 1). Given a size,
+        an existing pool is resized to it.'''
+    with _pools_lock:
+        pool = _pools.get(inkscape_path)
+        if pool is None:
+            pool = _pools[inkscape_path] = WorkerPool(inkscape_path, size or 1)
+        elif size:
+            pool.size = max(1, size)
+        return pool
+
+
+def close_pools():
+    '''Quits the workers of every shared pool.'''
+    with _pools_lock:
+        pools = _pools.values()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_pools)
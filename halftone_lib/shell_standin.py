@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+'''A stand-in for the command line of Inkscape 0.92, enough of it to test the
+renderers and the shell worker pool where Inkscape is not installed.
+
+usage: shell_standin.py [--startup=SECONDS] [--delay=SECONDS] --shell
+       shell_standin.py [--startup=SECONDS] [--delay=SECONDS] FILE --export-png=PNG ...
+
+Exports are answered with a flat grey PNG the size of the page, or of the
+--export-area x0:y0:x1:y1, scaled to --export-width; --export-png=/dev/stdout writes it to the stdout pipe.
+--startup and --delay sleep to mimic Inkscape's start-up and export times,
+by default the seconds in the environment variables SHELL_STANDIN_STARTUP
+and SHELL_STANDIN_DELAY. Give the path of this (executable) script as the
+inkscape path to use it.
+'''
+import os
+import re
+import sys
+import shlex
+import time
+
+from lxml import etree
+from PIL import Image
+
+GREY = 160
+BANNER = 'Inkscape 0.92 (stand-in) interactive shell mode. Type \'quit\' to quit.\n'
+
+
+def length(value, default=100.0):
+    '''Returns the number a width or height attribute starts with.'''
+    match = re.match(r'\s*([0-9.]+)', value or '')
+    return float(match.group(1)) if match else default
+
+
+def parse_export(arguments):
+    '''Returns (file, png, area, width) from an export command line.'''
+    svg_path = png_path = area = width = None
+    arguments = list(arguments)
+    while arguments:
+        argument = arguments.pop(0)
+        if '=' not in argument and argument in ('--export-png', '-e', '--export-area', '-a',
+                                                '--export-width', '-w') and arguments:
+            argument += '=' + arguments.pop(0)
+        name, _, value = argument.partition('=')
+        if name in ('--export-png', '-e'):
+            png_path = value
+        elif name in ('--export-area', '-a'):
+            area = [float(number) for number in value.split(':')]
+        elif name in ('--export-width', '-w'):
+            width = int(value)
+        elif not argument.startswith('-'):
+            svg_path = argument
+    return svg_path, png_path, area, width
+
+
+def export(arguments, delay=0.0):
+    '''Writes the PNG of one export command line and returns its report.'''
+    svg_path, png_path, area, width = parse_export(arguments)
+    if svg_path is None or png_path is None:
+        return 'Nothing to do!\n'
+    try:
+        root = etree.parse(svg_path).getroot()
+    except (IOError, etree.XMLSyntaxError) as error:
+        return 'Could not open %s: %s\n' % (svg_path, error)
+    if area is None:
+        size = (length(root.get('width')), length(root.get('height')))
+    else:
+        size = (area[2] - area[0], area[3] - area[1])
+    if width is None:
+        width = int(round(size[0]))
+    height = max(1, int(round(width * size[1] / size[0])))
+    time.sleep(delay)
+    # left in the stdout buffer like Inkscape's own messages, so with
+    # --export-png=/dev/stdout it lands after the PNG
+    sys.stdout.write('Background RRGGBBAA: ffffff00\n')
+    Image.new('RGB', (width, height), (GREY, GREY, GREY)).save(png_path, 'PNG')
+    return 'Bitmap saved as: %s\n' % png_path
+
+
+def shell(delay=0.0):
+    '''Answers export commands read from stdin one line at a time, split
+        like a command line and each followed by the prompt, until quit or
+        the end of the input.'''
+    sys.stdout.write(BANNER + '>')
+    sys.stdout.flush()
+    while True:
+        line = sys.stdin.readline()
+        if not line or line.strip() == 'quit':
+            break
+        sys.stdout.write(export(shlex.split(line), delay) + '>')
+        sys.stdout.flush()
+
+
+def main(argv):
+    startup = float(os.environ.get('SHELL_STANDIN_STARTUP', 0))
+    delay = float(os.environ.get('SHELL_STANDIN_DELAY', 0))
+    arguments = []
+    for argument in argv:
+        if argument.startswith('--startup='):
+            startup = float(argument.split('=', 1)[1])
+        elif argument.startswith('--delay='):
+            delay = float(argument.split('=', 1)[1])
+        else:
+            arguments.append(argument)
+    time.sleep(startup)
+    if '--shell' in arguments:
+        shell(delay)
+    else:
+        sys.stdout.write(export(arguments, delay))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,78 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import math
+
+import numpy
+
+
+def disc(diameter, span, supersample=4):
+    '''Returns a span x span uint8 sprite of an anti-aliased disc of the
+        given diameter (pixels) touching its top left corner. Every pixel
+        is covered by supersample x supersample samples.'''
+    size = span * supersample
+    centre = diameter * supersample / 2.0
+    grid = numpy.arange(size) + 0.5 - centre
+    inside = grid[:, numpy.newaxis]**2 + grid[numpy.newaxis, :]**2 <= centre**2
+    coverage = inside.reshape(span, supersample, span, supersample).mean(axis=3).mean(axis=1)
+    return numpy.rint(coverage * 255).astype(numpy.uint8)
+
+
+class DotAtlas(object):
+    '''The discs of every whole diameter 0 .. size pixels, each rendered
+        once, for stamping the dots of a halftone screen. size is the
+        largest dot, sample * scale for the halftone filters.'''
+
+    def __init__(self, size, supersample=4):
+        self.size = int(math.ceil(size))
+        self.span = self.size + 1
+        self.sprites = numpy.array([disc(diameter, self.span, supersample)
+                                    for diameter in range(self.size + 1)])
+
+    def stamp(self, shape, xs, ys, diameters):
+        '''Returns a uint8 plane of shape (rows, columns) with a dot of each
+            diameter stamped with its top left corner at xs, ys (float
+            arrays, pixels). Overlapping dots keep the darkest coverage.'''
+        rows, columns = shape
+        span = self.span
+        index = numpy.clip(numpy.rint(diameters), 0, self.size).astype(int)
+        xs = numpy.floor(numpy.asarray(xs) + 0.5).astype(int) + span
+        ys = numpy.floor(numpy.asarray(ys) + 0.5).astype(int) + span
+        # a margin of one sprite on every side takes the dots running over
+        # the edges, the dots entirely outside are dropped
+        keep = ((index > 0) & (xs > 0) & (xs < columns + 2 * span) &
+                (ys > 0) & (ys < rows + 2 * span))
+        index, xs, ys = index[keep], xs[keep], ys[keep]
+        plane = numpy.zeros((rows + 3 * span, columns + 3 * span), dtype=numpy.uint8)
+        for dy in range(span):
+            for dx in range(span):
+                values = self.sprites[index, dy, dx]
+                covered = values > 0
+                if covered.any():
+                    numpy.maximum.at(plane, (ys[covered] + dy, xs[covered] + dx),
+                                     values[covered])
+        return plane[span:span + rows, span:span + columns]
+
+
+_ATLASES = {}
+
+
+def get_atlas(size):
+    '''Returns the (cached) DotAtlas for dots up to size pixels.'''
+    size = int(math.ceil(size))
+    if size not in _ATLASES:
+        _ATLASES[size] = DotAtlas(size)
+    return _ATLASES[size]
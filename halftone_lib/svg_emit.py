@@ -0,0 +1,415 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import math
+import re
+import time
+
+import numpy
+from lxml import etree
+
+from halftone_lib import coords, svg_style
+
+
+def dot_centres(output):
+    '''Returns the centres (xs, ys) of the dots of a dithered 2-D array, one
+        per 0 (dark) pixel, row by row. Pixel (row i, column j) is drawn at
+        (2j, 2i), the grid the dither extensions always used.'''
+    rows, columns = numpy.nonzero(numpy.asarray(output) == 0)
+    return columns * 2, rows * 2
+
+
+def iter_dot_centres(output):
+    '''Same centres as dot_centres, generated one row at a time, so that
+        streamed output never holds the coordinates of every dot at once.'''
+    for i, row in enumerate(numpy.asarray(output)):
+        y = 2 * i
+        for j in numpy.nonzero(row == 0)[0].tolist():
+            yield 2 * j, y
+
+
+def circles_path(xs, ys, radius=1):
+    '''Returns path data drawing a circle of radius at every centre xs, ys
+        (integers). Each circle is a relative subpath of two arcs that moves
+        on from the start of the previous one, so the whole set of dots goes
+        into a single <path> element.'''
+    arcs = 'a%d,%d 0 1 0 %d,0a%d,%d 0 1 0-%d,0' % ((radius, radius, 2 * radius) * 2)
+    # every subpath starts (and its arcs end) on the left edge of its
+    # circle; the first relative moveto counts from the origin
+    starts_x = numpy.concatenate(([0], numpy.asarray(xs) - radius))
+    starts_y = numpy.concatenate(([0], numpy.asarray(ys)))
+    moves = zip(numpy.diff(starts_x).tolist(), numpy.diff(starts_y).tolist())
+    return ''.join(['m%d,%d%s' % (dx, dy, arcs) for dx, dy in moves])
+
+
+def dark_runs(output, merge_rows=False):
+    '''Returns the runs of consecutive 0 (dark) pixels of a dithered 2-D
+        array as arrays (rows, starts, lengths, heights), row by row. With
+        merge_rows, identical runs (same start and length) of consecutive
+        rows are merged into one run heights rows tall; otherwise every
+        height is 1.'''
+    dark = numpy.asarray(output) == 0
+    edges = numpy.zeros((dark.shape[0], dark.shape[1] + 2), dtype=numpy.int8)
+    edges[:, 1:-1] = dark
+    edges = numpy.diff(edges, axis=1)
+    rows, starts = numpy.nonzero(edges == 1)
+    ends = numpy.nonzero(edges == -1)[1]
+    lengths = ends - starts
+    heights = numpy.ones(len(rows), dtype=int)
+    if not merge_rows or not len(rows):
+        return rows, starts, lengths, heights
+    # line the runs up column by column so that a run and the one it
+    # continues in the next row are neighbours
+    order = numpy.lexsort((rows, lengths, starts))
+    rows, starts, lengths = rows[order], starts[order], lengths[order]
+    continues = numpy.zeros(len(rows), dtype=bool)
+    continues[1:] = ((starts[1:] == starts[:-1]) & (lengths[1:] == lengths[:-1]) &
+                     (rows[1:] == rows[:-1] + 1))
+    first = numpy.nonzero(~continues)[0]
+    heights = numpy.diff(numpy.append(first, len(rows)))
+    rows, starts, lengths = rows[first], starts[first], lengths[first]
+    order = numpy.lexsort((starts, rows))
+    return rows[order], starts[order], lengths[order], heights[order]
+
+
+def run_rects(runs):
+    '''Returns (x, y, width, height) of the rectangle covering each run, on
+        the same grid as the dots (a pixel spans 2 units around its dot).'''
+    rows, starts, lengths, heights = runs
+    return zip((2 * starts - 1).tolist(), (2 * rows - 1).tolist(),
+               (2 * lengths).tolist(), (2 * heights).tolist())
+
+
+def runs_path(runs):
+    '''Returns path data drawing every run as a closed relative subpath
+        (m, h, v, h, z), for a single <path> element per colour.'''
+    rects = run_rects(runs)
+    parts = []
+    x0 = y0 = 0
+    for x, y, width, height in rects:
+        parts.append('m%d,%dh%dv%dh-%dz' % (x - x0, y - y0, width, height, width))
+        x0, y0 = x, y
+    return ''.join(parts)
+
+
+def boundary_edges(dark):
+    '''Returns the unit edges between dark and light pixels of a boolean
+        2-D array as arrays (xs, ys, dxs, dys): start corner and direction
+        on the grid of pixel corners, pixel (row i, column j) spanning
+        corners (j, i) to (j+1, i+1). Every edge runs with the dark pixel on
+        its right, so outlines go clockwise and holes anticlockwise.'''
+    padded = numpy.zeros((dark.shape[0] + 2, dark.shape[1] + 2), dtype=bool)
+    padded[1:-1, 1:-1] = dark
+    inner = padded[1:-1, 1:-1]
+    sides = [
+        # (light neighbour, start corner offset, direction)
+        (padded[:-2, 1:-1], (0, 0), (1, 0)),    # top, left to right
+        (padded[1:-1, 2:], (1, 0), (0, 1)),     # right, downwards
+        (padded[2:, 1:-1], (1, 1), (-1, 0)),    # bottom, right to left
+        (padded[1:-1, :-2], (0, 1), (0, -1)),   # left, upwards
+    ]
+    xs, ys, dxs, dys = [], [], [], []
+    for neighbour, (ox, oy), (dx, dy) in sides:
+        rows, columns = numpy.nonzero(inner & ~neighbour)
+        xs.append(columns + ox)
+        ys.append(rows + oy)
+        dxs.append(numpy.repeat(dx, len(rows)))
+        dys.append(numpy.repeat(dy, len(rows)))
+    return (numpy.concatenate(xs), numpy.concatenate(ys),
+            numpy.concatenate(dxs), numpy.concatenate(dys))
+
+
+def trace_contours(output):
+    '''Traces the outlines of the connected dark (0) regions of a dithered
+        2-D array, marching along the pixel edges. Returns a list of closed
+        loops, each a list of its corners (x, y) on the pixel corner grid.
+        Where two dark pixels touch only at a corner the trace turns right,
+        keeping them apart (dark regions are 4-connected).'''
+    xs, ys, dxs, dys = [values.tolist() for values in
+                        boundary_edges(numpy.asarray(output) == 0)]
+    starts = {}
+    for edge, corner in enumerate(zip(xs, ys)):
+        starts.setdefault(corner, []).append(edge)
+    used = [False] * len(xs)
+    loops = []
+    for first in range(len(xs)):
+        if used[first]:
+            continue
+        corners = []
+        edge = first
+        while True:
+            used[edge] = True
+            dx, dy = dxs[edge], dys[edge]
+            end = (xs[edge] + dx, ys[edge] + dy)
+            following = [other for other in starts[end]
+                         if not used[other] or other == first]
+            if len(following) > 1:
+                # the right turn of (dx, dy) is (-dy, dx) with y pointing down
+                following = [other for other in following
+                             if (dxs[other], dys[other]) == (-dy, dx)]
+            following = following[0]
+            if following == first:
+                # the loop is closed
+                break
+            if (dxs[following], dys[following]) != (dx, dy):
+                corners.append(end)
+            edge = following
+        if (dxs[first], dys[first]) != (dxs[edge], dys[edge]):
+            corners.insert(0, (xs[first], ys[first]))
+        loops.append(corners)
+    return loops
+
+
+def simplify(corners, tolerance):
+    '''Douglas-Peucker simplification of a closed loop of corners: drops
+        every corner within tolerance of the line between the corners kept
+        around it. Returns the kept corners, fewer than 3 if the loop
+        collapses.'''
+    points = corners + corners[:1]
+    x0, y0 = points[0]
+    # split the loop at the corner farthest from the first one
+    far = max(range(len(points)), key=lambda index: (points[index][0] - x0)**2 +
+                                                    (points[index][1] - y0)**2)
+    keep = [False] * len(points)
+    keep[0] = keep[far] = keep[-1] = True
+    pending = [(0, far), (far, len(points) - 1)]
+    while pending:
+        first, last = pending.pop()
+        if last - first < 2:
+            continue
+        (x1, y1), (x2, y2) = points[first], points[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+        if length:
+            distances = [abs((x - x1) * dy - (y - y1) * dx) / length
+                         for x, y in points[first + 1:last]]
+        else:
+            distances = [math.hypot(x - x1, y - y1) for x, y in points[first + 1:last]]
+        distance = max(distances)
+        if distance > tolerance:
+            middle = first + 1 + distances.index(distance)
+            keep[middle] = True
+            pending.extend([(first, middle), (middle, last)])
+    return [corner for corner, kept in zip(corners, keep) if kept]
+
+
+def contours_path(loops, tolerance=0):
+    '''Returns path data filling the traced loops, on the grid of the dots
+        (pixel corner (x, y) at (2x-1, 2y-1)). Holes wind the other way round
+        than their outlines, so the default nonzero fill rule leaves them
+        open. With a tolerance (pixels) the loops are simplified first,
+        which turns staircases into slanted l segments.'''
+    parts = []
+    # the first relative moveto counts from the origin, which is corner (0.5, 0.5)
+    x0 = y0 = 0.5
+    for corners in loops:
+        if tolerance:
+            corners = simplify(corners, tolerance)
+            if len(corners) < 3:
+                continue
+        x, y = corners[0]
+        parts.append('m%d,%d' % (2 * (x - x0), 2 * (y - y0)))
+        x0, y0 = x, y
+        for next_x, next_y in corners[1:]:
+            if next_y == y:
+                parts.append('h%d' % (2 * (next_x - x)))
+            elif next_x == x:
+                parts.append('v%d' % (2 * (next_y - y)))
+            else:
+                parts.append('l%d,%d' % (2 * (next_x - x), 2 * (next_y - y)))
+            x, y = next_x, next_y
+        parts.append('z')
+    return ''.join(parts)
+
+
+def shapes(output, emitter, merge_rows=False, tolerance=0):
+    '''Returns the elements drawing the dark pixels of a dithered array
+        other than as one circle per dot, as a list of (tag, geometry):
+        ('path', d) for the 'path' and 'run-path' emitters, and
+        ('rect', (x, y, width, height)) for every run with 'rects', and
+        ('path', d) of the traced outlines of the dark regions with
+        'contours', simplified to tolerance pixels unless it is 0.'''
+    if emitter == 'path':
+        xs, ys = dot_centres(output)
+        return [('path', circles_path(xs, ys, 1))] if len(xs) else []
+    if emitter == 'contours':
+        d = contours_path(trace_contours(output), tolerance)
+        return [('path', d)] if d else []
+    runs = dark_runs(output, merge_rows)
+    if emitter == 'rects':
+        return [('rect', rect) for rect in run_rects(runs)]
+    if emitter == 'run-path':
+        return [('path', runs_path(runs))] if len(runs[0]) else []
+    raise KeyError('Unknown SVG emitter %r, choose circles, path, rects, '
+                   'run-path or contours' % emitter)
+
+
+# the namespace declarations lxml repeats on every element serialized on its
+# own, which the element does not carry inside the document
+_NAMESPACES = re.compile(r' xmlns(?::\w+)?="[^"]*"')
+
+
+def serialized_size(element):
+    '''Returns the size in bytes of an element as written in its document.'''
+    return len(_NAMESPACES.sub('', etree.tostring(element)))
+
+
+def circles_size(xs, ys, template):
+    '''Returns the serialized size of one <circle> per dot at xs, ys, from
+        the size template of the same circle at (0, 0).'''
+    digits = sum(len(str(value)) for value in xs.tolist() + ys.tolist())
+    return len(xs) * (template - 2) + digits
+
+
+def reduction_report(name, dots, elements, circle_bytes, size):
+    '''Returns a one line summary of the elements and bytes saved over
+        drawing one circle per dot.'''
+    saved = 100.0 * (circle_bytes - size) / circle_bytes if circle_bytes else 0.0
+    return ('%s: %d dots in %d elements instead of %d, %d bytes instead of %d '
+            '(%.1f%% smaller)' % (name, dots, elements, dots, size, circle_bytes, saved))
+
+
+def cull_dots(dots, min_radius=0):
+    '''Returns the (x, y, radius) dots large enough to see, those of radius
+        above min_radius. Light cells give dots of radius 0 or less, which
+        have no area (and a negative radius is an error in SVG).'''
+    return [dot for dot in dots if dot[2] > min_radius]
+
+
+def culling_report(names, totals, culled, seconds=None):
+    '''Returns a summary of the dots culled from each separation. Given the
+        seconds taken to draw the dots that were kept, the time the culled
+        ones would have taken is estimated as well.'''
+    lines = ['%s: %d of %d dots culled (%.1f%%)'
+             % (name, count, total, 100.0 * count / total if total else 0.0)
+             for name, total, count in zip(names, totals, culled)]
+    if seconds is not None:
+        kept = sum(totals) - sum(culled)
+        saved = seconds * sum(culled) / kept if kept else 0.0
+        lines.append('about %.3fs of drawing saved' % saved)
+    return '\n'.join(lines)
+
+
+class CullingReport(object):
+    '''The culling_report of separations culled from totals dots, with the
+        time the kept dots took to draw, as draw() draws them. Dots draw()
+        streams into a svg_stream.DocumentStream are only generated while
+        the output is written, and are timed then; deliver() holds the
+        report back until the last of them is done.'''
+
+    def __init__(self, names, totals, separations, stream=None):
+        self.names = names
+        self.totals = totals
+        self.culled = [total - len(dots) for total, dots in zip(totals, separations)]
+        self.stream = stream
+        self.seconds = 0.0
+        self.pending = 0
+        self.write = None
+
+    def draw(self, draw, *args):
+        '''Calls draw(*args), timing it and the items it streams.'''
+        first = len(self.stream.streams) if self.stream is not None else 0
+        start = time.time()
+        draw(*args)
+        self.seconds += time.time() - start
+        if self.stream is not None:
+            for index in range(first, len(self.stream.streams)):
+                marker, items = self.stream.streams[index]
+                self.stream.streams[index] = (marker, self.timed(items))
+                self.pending += 1
+
+    def timed(self, items):
+        items = iter(items)
+        while True:
+            start = time.time()
+            try:
+                item = next(items)
+            except StopIteration:
+                break
+            finally:
+                self.seconds += time.time() - start
+            yield item
+        self.pending -= 1
+        if not self.pending and self.write is not None:
+            self.write(self.text())
+
+    def text(self):
+        return culling_report(self.names, self.totals, self.culled, self.seconds)
+
+    def deliver(self, write):
+        '''Calls write with the report text once all the dots are drawn.'''
+        if self.pending:
+            self.write = write
+        else:
+            write(self.text())
+
+
+def dot_buckets(dots, step):
+    '''Groups (x, y, radius) dots by their radius rounded to a multiple of
+        step, for drawing every dot size once as a <symbol>. Returns
+        {radius: [(x, y), ...]}; dots rounding to a radius of 0 or less
+        have no area and are left out.'''
+    buckets = {}
+    for x, y, radius in dots:
+        radius = round(radius / step) * step
+        if radius > 0:
+            buckets.setdefault(radius, []).append((x, y))
+    return buckets
+
+
+USE = '{%s}use' % svg_style.SVG_NS
+XLINK_HREF = '{http://www.w3.org/1999/xlink}href'
+
+
+def use_items(dots, symbols, precision=None):
+    '''Yields the (tag, attrib) of a <use> of the symbols[radius] for every
+        dot of the {radius: [(x, y), ...]} buckets dots, positions formatted
+        with coords.compact at precision.'''
+    for radius in sorted(dots):
+        # the symbol circle touches the top left of its viewport
+        xs, ys = (numpy.asarray(dots[radius], dtype=float) - radius).T
+        for x, y in zip(coords.compact(xs, precision), coords.compact(ys, precision)):
+            yield USE, {XLINK_HREF: symbols[radius], 'x': x, 'y': y}
+
+
+def draw_instances(parent, defs, colors, transforms, separations, step,
+                   precision=None, stream=None):
+    '''Draws the (x, y, radius) dots of each separation as <use> references
+        to a <symbol> per dot size (see dot_buckets), added to defs and shared
+        by all the separations. Fill, blend mode and screen angle (degrees,
+        one per colour) go on one group per colour in parent. Given a
+        svg_stream.DocumentStream, the <use> elements are streamed into the
+        groups instead of built.'''
+    buckets = [dot_buckets(dots, step) for dots in separations]
+    symbols = {}
+    for radius in sorted(set().union(*buckets)):
+        symbol_id = '%s_dot%d' % (parent.get('id'), len(symbols))
+        symbol = etree.SubElement(defs, '{%s}symbol' % svg_style.SVG_NS, {'id': symbol_id})
+        etree.SubElement(symbol, '{%s}circle' % svg_style.SVG_NS,
+                         {'cx': '%g' % radius, 'cy': '%g' % radius, 'r': '%g' % radius})
+        symbols[radius] = '#' + symbol_id
+    for color, transform, dots in zip(colors, transforms, buckets):
+        style = {'stroke': 'none', 'fill': color, "mix-blend-mode" : "multiply"}
+        group = etree.SubElement(parent, '{%s}g' % svg_style.SVG_NS,
+                                 {'style': svg_style.format_style(style)})
+        if transform:
+            group.set('transform', 'rotate(%g)' % transform)
+        items = use_items(dots, symbols, precision)
+        if stream is not None:
+            stream.stream(group, items)
+            continue
+        for tag, attrib in items:
+            etree.SubElement(group, tag, attrib)
@@ -0,0 +1,94 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+from xml.sax.saxutils import escape
+
+from lxml import etree
+
+# escaped the way lxml writes attribute values
+ATTRIBUTE_ENTITIES = {'"': '&quot;', '\n': '&#10;', '\r': '&#13;', '\t': '&#9;'}
+CHUNK_SIZE = 1 << 16
+
+
+def qualified_name(tag, nsmap):
+    '''Returns the name tag ({namespace}local) is written as under the
+        namespace declarations nsmap.'''
+    if not tag.startswith('{'):
+        return tag
+    namespace, local = tag[1:].split('}', 1)
+    for prefix, uri in nsmap.items():
+        if uri == namespace:
+            return local if prefix is None else '%s:%s' % (prefix, local)
+    raise ValueError('namespace %s is not declared' % namespace)
+
+
+def element_markup(name, attrib, nsmap=None):
+    '''Returns an empty element <name .../> the way lxml serializes one
+        made from the attribute dict attrib (keys in sorted order).
+        Namespaced keys ({namespace}local) are written under the namespace
+        declarations nsmap.'''
+    return '<%s%s/>' % (name, ''.join(' %s="%s"' % (qualified_name(key, nsmap or {}),
+                                                    escape(value, ATTRIBUTE_ENTITIES))
+                                      for key, value in sorted(attrib.items())))
+
+
+class DocumentStream(object):
+    '''Writes a document whose bulk, the dots of a halftone, is never built
+        as elements. Each stream is an iterable of (tag, attrib) pairs,
+        usually a generator reading the halftone arrays, held in the tree by
+        a marker comment; write() serializes the (small) tree and splices
+        the markup of the streamed elements in at the markers, chunk by
+        chunk, as it is generated.'''
+
+    def __init__(self, document):
+        self.document = document
+        self.streams = []
+
+    def stream(self, parent, items):
+        '''Queues items to be written as the next children of parent.'''
+        marker = etree.Comment(' halftone-stream-%d ' % len(self.streams))
+        parent.append(marker)
+        self.streams.append((marker, items))
+        return marker
+
+    def write(self, out, chunk_size=CHUNK_SIZE):
+        '''Writes the document to the file object out and returns the number
+            of bytes written.'''
+        text = etree.tostring(self.document)
+        written = 0
+        for marker, items in self.streams:
+            head, text = text.split(etree.tostring(marker), 1)
+            out.write(head)
+            written += len(head)
+            nsmap = marker.getparent().nsmap
+            names = {}
+            chunk = []
+            size = 0
+            for tag, attrib in items:
+                if tag not in names:
+                    names[tag] = qualified_name(tag, nsmap)
+                markup = element_markup(names[tag], attrib, nsmap)
+                chunk.append(markup)
+                size += len(markup)
+                if size >= chunk_size:
+                    out.write(''.join(chunk))
+                    written += size
+                    chunk = []
+                    size = 0
+            out.write(''.join(chunk))
+            written += size
+        out.write(text)
+        return written + len(text)
@@ -0,0 +1,169 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import itertools
+
+from lxml import etree
+
+import simplestyle
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+BLEND = 'mix-blend-mode'
+
+_FORMATTED = {}
+
+
+def format_style(style):
+    '''Same as simplestyle.formatStyle, but every distinct style dict is only
+        formatted once.'''
+    key = tuple(style.items())
+    if key not in _FORMATTED:
+        _FORMATTED[key] = simplestyle.formatStyle(style)
+    return _FORMATTED[key]
+
+
+class StyleSheet(object):
+    '''The CSS classes of the halftones of a document, kept in one <style>
+        element of its <defs>. Each distinct inline style becomes one class,
+        ht0, ht1, ..., shared by every halftone written to the document.'''
+
+    ID = 'halftone-css'
+
+    def __init__(self, root):
+        self.root = root
+        self.rules = []
+        self._classes = {}
+        self.element = None
+        for element in root.iter('{%s}style' % SVG_NS):
+            if element.get('id') == self.ID:
+                self.element = element
+                for line in (element.text or '').splitlines():
+                    name, style = line[1:-1].split('{', 1)
+                    self._add(name, style)
+
+    def _add(self, name, style):
+        self.rules.append((name, style))
+        self._classes[style] = name
+
+    def class_name(self, style):
+        '''Returns the class of an inline style string, adding it if new.'''
+        if style not in self._classes:
+            self._add('ht%d' % len(self.rules), style)
+        return self._classes[style]
+
+    def css(self):
+        return '\n'.join('.%s{%s}' % rule for rule in self.rules)
+
+    def write(self):
+        '''Writes the rules to the <style> element, created in <defs> the
+            first time.'''
+        if self.element is None:
+            defs = self.root.find('{%s}defs' % SVG_NS)
+            if defs is None:
+                defs = etree.SubElement(self.root, '{%s}defs' % SVG_NS)
+            self.element = etree.SubElement(defs, '{%s}style' % SVG_NS,
+                                            {'type': 'text/css', 'id': self.ID})
+        self.element.text = self.css()
+        return self.element
+
+
+def _split_blend(style):
+    '''Returns (style without the blend mode, blend style or None).'''
+    parsed = simplestyle.parseStyle(style)
+    blend = parsed.pop(BLEND, None)
+    if blend is None:
+        return style, None
+    return simplestyle.formatStyle(parsed), simplestyle.formatStyle({BLEND: blend})
+
+
+def _classed_items(items, style, name):
+    # the streamed shapes of style get its class instead
+    for tag, attrib in items:
+        if attrib.get('style') == style:
+            attrib = dict(attrib)
+            del attrib['style']
+            attrib['class'] = name
+        yield tag, attrib
+
+
+def _stream_style(stream, marker):
+    '''Returns the index of marker in the svg_stream.DocumentStream stream
+        and the style of its first item (None if it has none), or (None,
+        None) if marker is not one of its markers. The first item is
+        generated here and put back in front of the rest.'''
+    for index, (streamed, items) in enumerate(stream.streams):
+        if streamed is marker:
+            break
+    else:
+        return None, None
+    items = iter(items)
+    for first in items:
+        stream.streams[index] = (marker, itertools.chain([first], items))
+        return index, first[1].get('style')
+    return index, None
+
+
+def use_classes(group, root, stream=None):
+    '''Replaces the inline styles of the children of group by shared CSS
+        classes in a <style> element of root's <defs>. A blend mode is taken
+        off the shapes and set once on a new <g> around each run of
+        consecutive shapes of the same style (a separation), so the
+        renderer composites every separation in one go rather than every
+        dot. Child groups keep their blend mode. The shapes streamed into
+        group by the svg_stream.DocumentStream stream are treated the same,
+        on the assumption that every stream is of one style (that of its
+        first shape). Returns the StyleSheet.'''
+    sheet = StyleSheet(root)
+    split = {}
+    wrapper = None
+    wrapped_style = None
+    for child in list(group):
+        index = None
+        if child.tag is etree.Comment:
+            if stream is not None:
+                index, style = _stream_style(stream, child)
+            if index is None:
+                wrapper = None
+                continue
+        else:
+            style = child.get('style')
+        if style is None:
+            wrapper = None
+            continue
+        if child.tag == '{%s}g' % SVG_NS:
+            del child.attrib['style']
+            child.set('class', sheet.class_name(style))
+            wrapper = None
+            continue
+        if style not in split:
+            split[style] = _split_blend(style)
+        shape_style, blend = split[style]
+        if index is None:
+            del child.attrib['style']
+            child.set('class', sheet.class_name(shape_style))
+        else:
+            marker, items = stream.streams[index]
+            stream.streams[index] = (marker, _classed_items(items, style, sheet.class_name(shape_style)))
+        if blend is None:
+            wrapper = None
+            continue
+        if wrapper is None or wrapped_style != style:
+            wrapper = etree.Element('{%s}g' % SVG_NS, {'class': sheet.class_name(blend)})
+            child.addprevious(wrapper)
+            wrapped_style = style
+        wrapper.append(child)
+    sheet.write()
+    return sheet
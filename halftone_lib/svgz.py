@@ -0,0 +1,57 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import gzip
+
+DEFAULT_LEVEL = 6
+DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+
+
+class CountingFile(object):
+    '''Passes writes on to a file object, counting the bytes.'''
+
+    def __init__(self, out):
+        self.out = out
+        self.written = 0
+
+    def write(self, data):
+        self.out.write(data)
+        self.written += len(data)
+
+
+def write_svgz(path, write, level=DEFAULT_LEVEL):
+    '''Writes a gzip-compressed SVG file. write(out) writes the document to
+        the file object out (ElementTree.write or DocumentStream.write); its
+        output is compressed as it comes, at gzip level 1 (fastest) to 9
+        (smallest), so the uncompressed document is never held in memory.
+        Returns the (uncompressed, compressed) sizes in bytes.'''
+    with open(path, 'wb') as raw:
+        compressed = CountingFile(raw)
+        archive = gzip.GzipFile(filename='', mode='wb', compresslevel=level, fileobj=compressed)
+        try:
+            document = CountingFile(archive)
+            document.write(DECLARATION)
+            write(document)
+        finally:
+            archive.close()
+    return document.written, compressed.written
+
+
+def report(path, uncompressed, compressed):
+    '''Returns a one line summary of a written SVGZ file.'''
+    ratio = 100.0 * compressed / uncompressed if uncompressed else 0.0
+    return ('%s: %d bytes written, %d bytes of SVG (%.1f%%)'
+            % (path, compressed, uncompressed, ratio))
@@ -0,0 +1,93 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+'''Cell statistics against the per cell crop and ImageStat loop of the
+clustered dot and newsprint extensions.'''
+import unittest
+
+import numpy
+from PIL import Image, ImageStat
+
+from halftone_lib import cells
+
+
+def legacy_dots(channel, sample, scale):
+    # the clustered dot loop: one crop per cell, padded with zeros past the
+    # edges, its mean giving the dot
+    dots = []
+    for x in xrange(0, channel.size[0], sample):
+        for y in xrange(0, channel.size[1], sample):
+            box = channel.crop((x, y, x + sample, y + sample))
+            stat = ImageStat.Stat(box)
+            diameter = (stat.mean[0] / 255)**0.5
+            edge = 0.5*(1-diameter)
+            x_pos, y_pos = (x+edge)*scale, (y+edge)*scale
+            box_edge = sample*diameter*scale
+            dots.append(((2*x_pos+box_edge)/2, (2*y_pos+box_edge)/2, box_edge-5))
+    return dots
+
+
+def channel(height, width, seed=1):
+    return numpy.random.RandomState(seed).randint(0, 256, (height, width)).astype(numpy.uint8)
+
+
+class CellsTest(unittest.TestCase):
+
+    def test_channel_dots_match_crop_loop(self):
+        for shape, sample, scale in (((30, 40), 10, 1), ((23, 17), 5, 2), ((7, 9), 4, 1)):
+            data = channel(*shape, seed=sample)
+            self.assertEqual(cells.channel_dots(data, sample, scale),
+                             legacy_dots(Image.fromarray(data), sample, scale))
+
+    def test_cell_means_with_origin(self):
+        data = channel(13, 11, seed=2)
+        sample, origin = 4, (1, 3)
+        padded = numpy.zeros((13 + 8, 11 + 8))
+        padded[4:-4, 4:-4] = data
+        xs = cells.cell_origins(11, sample, origin[0])
+        ys = cells.cell_origins(13, sample, origin[1])
+        means = cells.cell_means(data, sample, origin)
+        self.assertEqual(means.shape, (len(ys), len(xs)))
+        for row, y in enumerate(ys):
+            for column, x in enumerate(xs):
+                expected = padded[y+4:y+4+sample, x+4:x+4+sample].sum() / float(sample * sample)
+                self.assertAlmostEqual(means[row, column], expected)
+
+    def test_cell_origins(self):
+        self.assertEqual(cells.cell_origins(10, 4).tolist(), [0, 4, 8])
+        self.assertEqual(cells.cell_origins(10, 4, 1).tolist(), [-3, 1, 5, 9])
+
+    def test_summed_area_table(self):
+        data = channel(9, 12, seed=3).astype(numpy.int64)
+        table = cells.SummedAreaTable(data)
+        for x, y, width, height in ((0, 0, 3, 3), (-2, -1, 4, 5), (10, 7, 5, 5), (4, 2, 1, 6)):
+            expected = data[max(y, 0):max(y + height, 0), max(x, 0):max(x + width, 0)].sum()
+            self.assertEqual(table.box_sums(numpy.array([x]), numpy.array([y]), width, height)[0],
+                             expected)
+
+    def test_lattice_diameters(self):
+        data = numpy.zeros((20, 20), dtype=numpy.uint8) + 255
+        xs, ys = cells.rotated_lattice((20, 20), 5, 45)
+        self.assertTrue(len(xs))
+        diameters = cells.lattice_diameters(data, xs, ys, 5)
+        self.assertTrue(numpy.all(diameters <= 1.0))
+        # cells wholly inside the image see only ink
+        inside = (xs > 3) & (xs < 17) & (ys > 3) & (ys < 17)
+        self.assertTrue(numpy.allclose(diameters[inside], 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
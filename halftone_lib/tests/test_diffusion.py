@@ -0,0 +1,185 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+'''The diffusion engines against the per pixel loops the extensions used
+before them, and the wavefront engine against the serial ones.'''
+import unittest
+
+import numpy
+from PIL import Image
+
+from halftone_lib import diffusion, kernels, wavefront
+
+
+def legacy_clamped(data):
+    # the Floyd-Steinberg loop of Raster_to_Raster/error_diffusion.py,
+    # writing every value back through PixelAccess
+    image = Image.fromarray(numpy.asarray(data, dtype=numpy.uint8)).copy()
+    image_index = image.load()
+    size = image.size
+    for y in range(0, size[1]-1):
+        for x in range(1, size[0]-1):
+            neighbour_index = image_index[x, y]
+            if(neighbour_index>127) :
+                image_index[x,y] = 255
+            else :
+                image_index[x,y] = 0
+            diffused_error = neighbour_index - image_index[x, y]
+            image_index[x+1, y] = int(image_index[x+1, y] + 7/16.0 * diffused_error)
+            image_index[x-1, y+1] = int(image_index[x-1, y+1] + 3/16.0 * diffused_error)
+            image_index[x,y+1] = int(image_index[x,   y+1] + 5/16.0 * diffused_error)
+            image_index[x+1, y+1] =int(image_index[x+1, y+1] + 1/16.0 * diffused_error)
+    return numpy.asarray(image)
+
+
+def legacy_float(arr):
+    # the Floyd-Steinberg loop of the raster to svg error diffusion effect
+    height = len(arr)
+    width = len(arr[0])
+    err = [[0]*len(arr[0]) for i in range(len(arr))]
+    crr = numpy.zeros((len(arr),len(arr[0])))
+    for i in range(height):
+        for j in range(width):
+            if(arr[i][j] + err[i][j] < 128):
+                crr[i][j] = 0
+            else:
+                crr[i][j] = 255
+            diff = arr[i][j] + err[i][j] - crr[i][j]
+            if(j+1 < width):
+                err[i][j+1] = float(float(err[i][j+1]) + float(diff*float(float(7)/float(16))))
+            if(i+1 < height):
+                err[i+1][j] = float(float(err[i+1][j]) + float(diff*float(float(5)/float(16))))
+            if(i+1 < height and j-1 >= 0):
+                err[i+1][j-1] = float(float(err[i+1][j-1]) + float(diff*float(float(3)/float(16))))
+            if(i+1 < height and j+1 < width):
+                err[i+1][j+1] = float(float(err[i+1][j+1]) + float(diff*float(float(1)/float(16))))
+    return crr
+
+
+def pixel_float(data, kernel):
+    # the same loop for any kernel: every pixel pushes its error to the taps
+    # inside the image, in scan order
+    data = numpy.asarray(data, dtype=numpy.float64).tolist()
+    height, width = len(data), len(data[0])
+    err = [[0.0] * width for _ in range(height)]
+    out = numpy.zeros((height, width), dtype=numpy.uint8)
+    for y in range(height):
+        for x in range(width):
+            value = data[y][x] + err[y][x]
+            new = 255 if value >= 128 else 0
+            out[y, x] = new
+            for dx, dy, weight in kernel.taps:
+                if 0 <= x + dx < width and y + dy < height:
+                    err[y+dy][x+dx] = err[y+dy][x+dx] + weight / float(kernel.divisor) * (value - new)
+    return out
+
+
+def pixel_clamped(data, kernel):
+    # the PixelAccess loop for any kernel: values truncated and clamped to
+    # 0..255 as they are written, the border the kernel cannot reach kept
+    image = numpy.asarray(data, dtype=numpy.uint8).astype(int).tolist()
+    height, width = len(image), len(image[0])
+    for y in range(height - kernel.depth):
+        for x in range(kernel.reach, width - kernel.reach):
+            value = image[y][x]
+            new = 255 if value > 127 else 0
+            image[y][x] = new
+            for dx, dy, weight in sorted(kernel.taps, key=lambda tap: (tap[1], tap[0])):
+                target = int(image[y+dy][x+dx] + weight / float(kernel.divisor) * (value - new))
+                image[y+dy][x+dx] = min(255, max(0, target))
+    return numpy.array(image, dtype=numpy.uint8)
+
+
+def gradient(height, width, seed=1):
+    '''A noisy ramp, so every tone gets diffused somewhere.'''
+    ramp = numpy.linspace(0, 255, width)[numpy.newaxis, :].repeat(height, axis=0)
+    noise = numpy.random.RandomState(seed).randint(-40, 40, (height, width))
+    return numpy.clip(ramp + noise, 0, 255).astype(numpy.uint8)
+
+
+class ScanlineDiffuseTest(unittest.TestCase):
+
+    def test_matches_pixel_access_loop(self):
+        data = gradient(23, 31)
+        self.assertTrue(numpy.array_equal(diffusion.scanline_diffuse(data), legacy_clamped(data)))
+
+    def test_every_kernel_matches_pixel_loop(self):
+        data = gradient(17, 29, seed=2)
+        for kernel in kernels.KERNELS.values():
+            self.assertTrue(numpy.array_equal(diffusion.scanline_diffuse(data, kernel),
+                                              pixel_clamped(data, kernel)), kernel.name)
+
+    def test_too_small_is_left_alone(self):
+        data = gradient(1, 5)
+        self.assertTrue(numpy.array_equal(diffusion.scanline_diffuse(data), data))
+
+
+class ErrorDiffuseTest(unittest.TestCase):
+
+    def test_matches_float_loop(self):
+        data = gradient(19, 27, seed=3)
+        self.assertTrue(numpy.array_equal(diffusion.error_diffuse(data), legacy_float(data)))
+
+    def test_every_kernel_matches_pixel_loop(self):
+        data = gradient(15, 22, seed=4)
+        for kernel in kernels.KERNELS.values():
+            self.assertTrue(numpy.array_equal(diffusion.error_diffuse(data, kernel),
+                                              pixel_float(data, kernel)), kernel.name)
+
+    def test_output_is_bilevel(self):
+        values = numpy.unique(diffusion.error_diffuse(gradient(8, 40, seed=5)))
+        self.assertTrue(set(values.tolist()) <= set([0, 255]))
+
+
+class KernelTest(unittest.TestCase):
+
+    def test_weights_sum_to_divisor(self):
+        for kernel in kernels.KERNELS.values():
+            total = sum(weight for _, _, weight in kernel.taps)
+            if kernel is kernels.ATKINSON:
+                # Atkinson diffuses only 6/8 of the error
+                self.assertEqual(total, 6)
+            else:
+                self.assertEqual(total, kernel.divisor, kernel.name)
+
+    def test_lookup_by_name(self):
+        self.assertIs(kernels.get_kernel('Floyd Steinberg'), kernels.FLOYD_STEINBERG)
+        self.assertIs(kernels.get_kernel('sierra_lite'), kernels.SIERRA_LITE)
+        self.assertRaises(KeyError, kernels.get_kernel, 'nope')
+
+
+class WavefrontTest(unittest.TestCase):
+
+    def test_matches_serial_engines(self):
+        data = gradient(21, 45, seed=6)
+        for kernel in (kernels.FLOYD_STEINBERG, kernels.JARVIS, kernels.SIERRA_LITE):
+            self.assertTrue(numpy.array_equal(
+                wavefront.wavefront_diffuse(data, kernel, workers=3, chunk=8),
+                diffusion.error_diffuse(data, kernel)), kernel.name)
+            self.assertTrue(numpy.array_equal(
+                wavefront.wavefront_diffuse(data, kernel, workers=3, clamp=True, chunk=8),
+                diffusion.scanline_diffuse(data, kernel)), kernel.name)
+
+    def test_diffuse_picks_the_engine(self):
+        data = gradient(9, 20, seed=7)
+        self.assertTrue(numpy.array_equal(wavefront.diffuse(data, workers=1),
+                                          diffusion.error_diffuse(data)))
+        self.assertTrue(numpy.array_equal(wavefront.diffuse(data, workers=2, clamp=True),
+                                          diffusion.scanline_diffuse(data)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+'''The export cache (keys, hits and least recently used eviction) and the
+splitting of PNGs out of Inkscape's stdout.'''
+import os
+import shutil
+import tempfile
+import unittest
+import StringIO
+
+from PIL import Image
+
+from halftone_lib import export_cache, png_pipe
+
+DOCUMENT = '''<svg xmlns="http://www.w3.org/2000/svg"
+    xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"
+    xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" width="100" height="50">
+  <metadata id="m">%s</metadata>
+  <sodipodi:namedview id="base" pagecolor="#ffffff" inkscape:zoom="%s"/>
+  <rect id="r" x="%s" y="0" width="10" height="10"/>
+</svg>'''
+
+
+def png(width=3, height=2):
+    data = StringIO.StringIO()
+    Image.new('L', (width, height), 200).save(data, 'PNG')
+    return data.getvalue()
+
+
+class ExportKeyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def key(self, metadata='', zoom='1', x='0', *args):
+        path = os.path.join(self.directory, 'drawing.svg')
+        with open(path, 'w') as svg:
+            svg.write(DOCUMENT % (metadata, zoom, x))
+        return export_cache.export_key(path, 'inkscape', *args)
+
+    def test_view_settings_do_not_count(self):
+        self.assertEqual(self.key(), self.key('author', '2.5'))
+
+    def test_drawing_area_and_width_count(self):
+        keys = set([self.key(), self.key('', '1', '5'),
+                    self.key('', '1', '0', (0.0, 0.0, 10.0, 10.0)),
+                    self.key('', '1', '0', (0.0, 0.0, 10.0, 10.0), 200)])
+        self.assertEqual(len(keys), 4)
+
+    def test_page_colour_counts(self):
+        path = os.path.join(self.directory, 'drawing.svg')
+        with open(path, 'w') as svg:
+            svg.write((DOCUMENT % ('', '1', '0')).replace('#ffffff', '#000000'))
+        self.assertNotEqual(export_cache.export_key(path, 'inkscape'), self.key())
+
+
+class ExportCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hits_and_misses(self):
+        cache = export_cache.ExportCache(os.path.join(self.directory, 'cache'))
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', png())
+        self.assertEqual(cache.get('a'), png())
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_least_recently_used_are_evicted(self):
+        data = png()
+        cache = export_cache.ExportCache(self.directory, 2 * len(data))
+        for age, key in enumerate(['old', 'used']):
+            cache.put(key, data)
+            os.utime(cache.path(key), (1000 + age, 1000 + age))
+        # a hit makes old the most recently used
+        cache.get('old')
+        cache.put('new', data)
+        self.assertEqual(sorted(os.path.basename(path) for _, _, path in cache.entries()),
+                         ['new.png', 'old.png'])
+        self.assertEqual(cache.evicted, 1)
+
+    def test_too_large_is_not_stored(self):
+        cache = export_cache.ExportCache(self.directory, 10)
+        cache.put('big', png())
+        self.assertEqual(cache.entries(), [])
+
+
+class SplitOutputTest(unittest.TestCase):
+
+    def test_png_between_messages(self):
+        data = png()
+        output = 'Background RRGGBBAA: ffffff00\n' + data + 'Bitmap saved as: /dev/stdout\n'
+        self.assertEqual(png_pipe.split_output(output),
+                         (data, 'Background RRGGBBAA: ffffff00\nBitmap saved as: /dev/stdout\n'))
+
+    def test_incomplete_png(self):
+        data = png()
+        self.assertEqual(png_pipe.split_output('text' + data[:-5]), (data[:-5], None))
+
+    def test_no_png(self):
+        self.assertEqual(png_pipe.split_output('Nothing to do!\n'), (None, 'Nothing to do!\n'))
+
+    def test_png_ends_after_iend(self):
+        data = png(40, 40)
+        self.assertEqual(png_pipe.png_end(data + '\n>', 0), len(data))
+
+
+if __name__ == '__main__':
+    unittest.main()
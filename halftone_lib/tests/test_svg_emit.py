@@ -0,0 +1,174 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+'''The SVG emitters against the one circle per dot loop of the dither
+extensions: every emitter must cover exactly the dark pixels.'''
+import unittest
+import StringIO
+
+import numpy
+from lxml import etree
+
+from halftone_lib import svg_stream
+
+try:
+    from halftone_lib import svg_emit
+except ImportError:
+    # svg_style needs simplestyle, from the Inkscape extensions folder
+    svg_emit = None
+
+SVG = 'http://www.w3.org/2000/svg'
+XLINK = 'http://www.w3.org/1999/xlink'
+
+
+def legacy_centres(output):
+    # the centres draw_svg gave its circles
+    centres = []
+    startu = 0
+    endu = 0
+    for i in range(len(output)):
+        for j in range(len(output[i])):
+            if (output[i][j]==0):
+                centres.append((int((startu+startu+1)/2),int((endu+endu+1)/2)))
+            startu = startu+2
+        endu = endu+2
+        startu = 0
+    return centres
+
+
+def dithered(height, width, seed=1):
+    dark = numpy.random.RandomState(seed).rand(height, width) < 0.4
+    return numpy.where(dark, 0, 255).astype(numpy.uint8)
+
+
+def loop_area(corners):
+    '''Returns the signed area of a closed loop (shoelace formula).'''
+    points = corners + corners[:1]
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(points, points[1:])) / 2.0
+
+
+@unittest.skipIf(svg_emit is None, 'simplestyle (Inkscape extensions) not on the path')
+class ShapesTest(unittest.TestCase):
+
+    def test_dot_centres_match_circle_loop(self):
+        output = dithered(9, 14)
+        xs, ys = svg_emit.dot_centres(output)
+        self.assertEqual(zip(xs.tolist(), ys.tolist()), legacy_centres(output))
+        self.assertEqual(list(svg_emit.iter_dot_centres(output)), legacy_centres(output))
+
+    def test_rects_cover_the_dark_pixels(self):
+        output = dithered(12, 15, seed=2)
+        for merge_rows in (False, True):
+            covered = numpy.zeros(output.shape, dtype=int)
+            for x, y, width, height in svg_emit.run_rects(svg_emit.dark_runs(output, merge_rows)):
+                # back from the dot grid: pixel j spans 2j-1 .. 2j+1
+                covered[(y + 1) // 2:(y + 1 + height) // 2, (x + 1) // 2:(x + 1 + width) // 2] += 1
+            self.assertTrue(numpy.array_equal(covered, (output == 0).astype(int)), merge_rows)
+
+    def test_merged_rows_are_fewer(self):
+        output = numpy.zeros((6, 4), dtype=numpy.uint8)
+        self.assertEqual(len(svg_emit.run_rects(svg_emit.dark_runs(output))), 6)
+        self.assertEqual(svg_emit.run_rects(svg_emit.dark_runs(output, True)), [(-1, -1, 8, 12)])
+
+    def test_contours_enclose_the_dark_pixels(self):
+        output = dithered(11, 13, seed=3)
+        loops = svg_emit.trace_contours(output)
+        self.assertEqual(sum(loop_area(corners) for corners in loops), (output == 0).sum())
+
+    def test_contour_with_hole(self):
+        output = numpy.zeros((3, 3), dtype=numpy.uint8)
+        output[1, 1] = 255
+        loops = svg_emit.trace_contours(output)
+        self.assertEqual(sorted(loop_area(corners) for corners in loops), [-1.0, 9.0])
+        self.assertEqual(svg_emit.contours_path(loops), 'm-1,-1h6v6h-6zm2,4h2v-2h-2z')
+
+    def test_simplify(self):
+        square = [(0, 0), (1, 0), (2, 0), (2, 2), (0, 2)]
+        self.assertEqual(svg_emit.simplify(square, 0.1), [(0, 0), (2, 0), (2, 2), (0, 2)])
+
+    def test_shapes(self):
+        output = dithered(5, 6, seed=4)
+        dots = (output == 0).sum()
+        self.assertEqual(svg_emit.shapes(output, 'path')[0][1].count('m'), dots)
+        self.assertEqual([tag for tag, _ in svg_emit.shapes(output, 'rects')],
+                         ['rect'] * len(svg_emit.run_rects(svg_emit.dark_runs(output))))
+        self.assertRaises(KeyError, svg_emit.shapes, output, 'nope')
+
+
+@unittest.skipIf(svg_emit is None, 'simplestyle (Inkscape extensions) not on the path')
+class CullingTest(unittest.TestCase):
+
+    def test_cull_dots(self):
+        dots = [(0, 0, -4.0), (1, 1, 0.0), (2, 2, 0.5), (3, 3, 2.0)]
+        self.assertEqual(svg_emit.cull_dots(dots), [(2, 2, 0.5), (3, 3, 2.0)])
+        self.assertEqual(svg_emit.cull_dots(dots, 1.0), [(3, 3, 2.0)])
+
+    def test_culling_report(self):
+        self.assertEqual(svg_emit.culling_report(['cyan', 'magenta'], [10, 0], [4, 0]),
+                         'cyan: 4 of 10 dots culled (40.0%)\nmagenta: 0 of 0 dots culled (0.0%)')
+        self.assertTrue(svg_emit.culling_report(['cyan'], [10], [5], 1.0).endswith(
+            'about 1.000s of drawing saved'))
+
+    def test_dot_buckets(self):
+        buckets = svg_emit.dot_buckets([(0, 0, 1.04), (2, 0, 0.96), (4, 0, 0.04), (6, 0, 2.0)], 0.1)
+        self.assertEqual(sorted(buckets), [1.0, 2.0])
+        self.assertEqual(buckets[1.0], [(0, 0), (2, 0)])
+
+
+@unittest.skipIf(svg_emit is None, 'simplestyle (Inkscape extensions) not on the path')
+class InstancesTest(unittest.TestCase):
+
+    separations = [[(1.0, 2.0, 1.5), (4.0, 2.0, 0.5), (7.0, 2.0, 0.01)],
+                   [(2.0, 3.0, 1.5)]]
+
+    def document(self):
+        root = etree.Element('{%s}svg' % SVG, nsmap={None: SVG, 'xlink': XLINK})
+        defs = etree.SubElement(root, '{%s}defs' % SVG)
+        parent = etree.SubElement(root, '{%s}g' % SVG, {'id': 'h'})
+        return root, defs, parent
+
+    def test_one_use_per_visible_dot(self):
+        root, defs, parent = self.document()
+        svg_emit.draw_instances(parent, defs, ['cyan', 'magenta'], [0, 15], self.separations, 0.5)
+        self.assertEqual(len(defs), 2)
+        uses = parent.findall('.//{%s}use' % SVG)
+        self.assertEqual(len(uses), 3)
+        self.assertEqual(parent[1].get('transform'), 'rotate(15)')
+        # the symbol circle touches the top left of its viewport
+        self.assertEqual((uses[0].get('x'), uses[0].get('y')), ('3.5', '1.5'))
+
+    def test_streamed_matches_built(self):
+        root, defs, parent = self.document()
+        svg_emit.draw_instances(parent, defs, ['cyan', 'magenta'], [0, 15], self.separations, 0.5, 2)
+        built = etree.tostring(root)
+        root, defs, parent = self.document()
+        stream = svg_stream.DocumentStream(root)
+        report = svg_emit.CullingReport(['cyan', 'magenta'], [4, 1], self.separations, stream)
+        report.draw(svg_emit.draw_instances, parent, defs, ['cyan', 'magenta'], [0, 15],
+                    self.separations, 0.5, 2, stream)
+        delivered = []
+        report.deliver(delivered.append)
+        # held back until the streamed dots are written
+        self.assertEqual(delivered, [])
+        out = StringIO.StringIO()
+        stream.write(out)
+        self.assertEqual(out.getvalue(), built)
+        self.assertEqual(len(delivered), 1)
+        self.assertTrue(delivered[0].startswith('cyan: 1 of 4 dots culled'))
+
+
+if __name__ == '__main__':
+    unittest.main()
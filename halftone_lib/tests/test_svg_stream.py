@@ -0,0 +1,89 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+'''Streamed markup against what lxml writes for the same elements, and the
+compact number formatting.'''
+import unittest
+import StringIO
+
+from lxml import etree
+
+from halftone_lib import coords, svg_stream
+
+SVG = 'http://www.w3.org/2000/svg'
+XLINK = 'http://www.w3.org/1999/xlink'
+
+
+class ElementMarkupTest(unittest.TestCase):
+
+    def test_matches_lxml(self):
+        attrib = {'x': '1.5', 'id': 'a"b<c>&\td', 'style': 'fill:red;\nstroke:none'}
+        element = etree.Element('circle', attrib)
+        self.assertEqual(svg_stream.element_markup('circle', attrib), etree.tostring(element))
+
+    def test_namespaced_keys(self):
+        nsmap = {None: SVG, 'xlink': XLINK}
+        root = etree.Element('{%s}svg' % SVG, nsmap=nsmap)
+        attrib = {'{%s}href' % XLINK: '#dot0', 'x': '2'}
+        child = etree.SubElement(root, '{%s}use' % SVG, attrib)
+        name = svg_stream.qualified_name('{%s}use' % SVG, nsmap)
+        self.assertEqual(name, 'use')
+        self.assertIn(svg_stream.element_markup(name, attrib, nsmap), etree.tostring(root))
+        self.assertRaises(ValueError, svg_stream.qualified_name, '{urn:other}a', nsmap)
+
+
+class DocumentStreamTest(unittest.TestCase):
+
+    def items(self, count):
+        for index in range(count):
+            yield 'rect', {'x': str(index), 'width': '2'}
+
+    def test_matches_built_tree(self):
+        built = etree.Element('svg')
+        group = etree.SubElement(built, 'g', {'id': 'g1'})
+        for tag, attrib in self.items(50):
+            etree.SubElement(group, tag, attrib)
+        etree.SubElement(built, 'g', {'id': 'after'})
+        streamed = etree.Element('svg')
+        group = etree.SubElement(streamed, 'g', {'id': 'g1'})
+        etree.SubElement(streamed, 'g', {'id': 'after'})
+        stream = svg_stream.DocumentStream(streamed)
+        stream.stream(group, self.items(50))
+        out = StringIO.StringIO()
+        written = stream.write(out, chunk_size=64)
+        self.assertEqual(out.getvalue(), etree.tostring(built))
+        self.assertEqual(written, len(out.getvalue()))
+
+
+class CompactTest(unittest.TestCase):
+
+    def test_floats(self):
+        self.assertEqual(coords.compact([1.0, 0.5, -0.25, -0.0, 12.125], 2),
+                         ['1', '.5', '-.25', '0', '12.12'])
+
+    def test_integers(self):
+        self.assertEqual(coords.compact([3, -4]), ['3', '-4'])
+
+    def test_empty(self):
+        self.assertEqual(coords.compact([]), [])
+        self.assertEqual(coords.compact_dots([]), [])
+
+    def test_path(self):
+        self.assertEqual(coords.compact_path('m1,-2h3,-4'), 'm1-2h3-4')
+
+
+if __name__ == '__main__':
+    unittest.main()
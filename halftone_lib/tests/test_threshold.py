@@ -0,0 +1,167 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+'''Threshold maps, pattern sets and bilevel packing against the per pixel
+loops of the ordered dithering and patterning extensions.'''
+import unittest
+
+import numpy
+
+from halftone_lib import bilevel, patterns, threshold
+
+
+def legacy_intensity(arr):
+    # the intensity levels 0 .. 9 of the ordered dithering and patterning
+    # extensions
+    mini = 999
+    maxi = 0
+    for i in range(len(arr)):
+        for j in range(len(arr[0])):
+            maxi = max(arr[i][j],maxi)
+            mini = min(arr[i][j],mini)
+    level = float(float(maxi-mini)/float(10));
+    brr = [[0]*len(arr[0]) for i in range(len(arr))]
+    for i in range(10):
+        l1 = mini+level*i
+        l2 = l1+level
+        for j in range(len(arr)):
+            for k in range(len(arr[0])):
+                if(arr[j][k] >= l1 and arr[j][k] <= l2):
+                    brr[j][k]=i
+    return numpy.array(brr)
+
+
+def legacy_order_dither(arr):
+    brr = legacy_intensity(arr)
+    crr = [[8, 3, 4], [6, 1, 2], [7, 5, 9]]
+    drr = numpy.zeros((len(arr),len(arr[0])))
+    for i in range(len(arr)):
+        for j in range(len(arr[0])):
+            if(brr[i][j] > crr[i%3][j%3]):
+                drr[i][j] = 255
+    return drr
+
+
+def tiles_loop(levels, tiles):
+    # places tile levels[i][j] at block (i, j), one pixel at a time
+    size = len(tiles[0])
+    out = numpy.zeros((len(levels) * size, len(levels[0]) * size))
+    for i in range(len(levels)):
+        for j in range(len(levels[0])):
+            for k in range(size):
+                for l in range(size):
+                    out[i*size+k][j*size+l] = tiles[levels[i][j]][k][l]
+    return out
+
+
+def image(height, width, seed=1, low=0, high=256):
+    return numpy.random.RandomState(seed).randint(low, high, (height, width)).astype(numpy.uint8)
+
+
+class QuantizeTest(unittest.TestCase):
+
+    def test_matches_intensity_loop(self):
+        for seed, low, high in ((1, 0, 256), (2, 30, 200), (3, 17, 19)):
+            data = image(13, 17, seed, low, high)
+            self.assertTrue(numpy.array_equal(threshold.quantize(data, 10), legacy_intensity(data)))
+
+    def test_flat_image(self):
+        data = numpy.zeros((4, 5), dtype=numpy.uint8) + 77
+        self.assertTrue(numpy.array_equal(threshold.quantize(data, 10), legacy_intensity(data)))
+
+
+class ThresholdMapTest(unittest.TestCase):
+
+    def test_classic_matches_ordered_dither_loop(self):
+        data = image(20, 23)
+        self.assertTrue(numpy.array_equal(threshold.CLASSIC.dither(data), legacy_order_dither(data)))
+
+    def test_bilevel_matches_dither(self):
+        data = image(11, 21, seed=4)
+        for name, size in (('classic', 3), ('bayer', 4), ('clustered', 5)):
+            threshold_map = threshold.get_map(name, size)
+            self.assertTrue(numpy.array_equal(threshold_map.dither_bilevel(data).to_array(),
+                                              threshold_map.dither(data)), name)
+
+    def test_matrices_hold_every_index_once(self):
+        for size in (2, 4, 8):
+            self.assertEqual(sorted(threshold.bayer_matrix(size).ravel().tolist()),
+                             range(size * size))
+        for size in (2, 3, 6):
+            self.assertEqual(sorted(threshold.clustered_matrix(size).ravel().tolist()),
+                             range(size * size))
+
+    def test_bayer_4(self):
+        self.assertEqual(threshold.bayer_matrix(4).tolist(),
+                         [[0, 8, 2, 10], [12, 4, 14, 6], [3, 11, 1, 9], [15, 7, 13, 5]])
+
+    def test_clustered_grows_from_the_centre(self):
+        matrix = threshold.clustered_matrix(5)
+        self.assertEqual(matrix[2, 2], 24)
+
+    def test_invalid_maps(self):
+        self.assertRaises(ValueError, threshold.get_map, 'bayer', 6)
+        self.assertRaises(ValueError, threshold.get_map, 'clustered', 1)
+        self.assertRaises(KeyError, threshold.get_map, 'nope', 4)
+
+
+class PatternSetTest(unittest.TestCase):
+
+    def test_classic_matches_tile_loop(self):
+        data = image(9, 14, seed=5)
+        tiles = patterns.CLASSIC.tiles.tolist()
+        self.assertTrue(numpy.array_equal(patterns.CLASSIC.expand(data),
+                                          tiles_loop(legacy_intensity(data), tiles)))
+
+    def test_nested_tiles(self):
+        pattern_set = patterns.get_pattern_set('bayer', 4)
+        self.assertEqual(pattern_set.levels, 17)
+        whites = [(tile == 255).sum() for tile in pattern_set.tiles]
+        self.assertEqual(whites, range(17))
+        # a cell once white stays white at every lighter level
+        self.assertTrue(numpy.all(pattern_set.tiles[1:] >= pattern_set.tiles[:-1]))
+
+    def test_bilevel_matches_expand(self):
+        data = image(10, 7, seed=6)
+        for pattern_set in (patterns.CLASSIC, patterns.get_pattern_set('clustered', 4)):
+            self.assertTrue(numpy.array_equal(pattern_set.expand_bilevel(data, band=3).to_array(),
+                                              pattern_set.expand(data)), pattern_set.name)
+
+    def test_invalid_sets(self):
+        self.assertRaises(ValueError, patterns.get_pattern_set, 'bayer', 3)
+        self.assertRaises(KeyError, patterns.get_pattern_set, 'nope', 4)
+
+
+class BilevelTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for width in (1, 8, 13):
+            data = numpy.where(image(5, width, seed=width) > 127, 255, 0).astype(numpy.uint8)
+            packed = bilevel.Bilevel.from_array(data)
+            self.assertEqual(packed.nbytes, 5 * ((width + 7) // 8))
+            self.assertTrue(numpy.array_equal(packed.to_array(), data))
+            self.assertTrue(numpy.array_equal(numpy.asarray(packed.to_image().convert('L')), data))
+
+    def test_set_rows(self):
+        data = numpy.where(image(6, 10, seed=7) > 127, 255, 0).astype(numpy.uint8)
+        packed = bilevel.Bilevel.empty(data.shape)
+        packed.set_rows(0, data[:4])
+        packed.set_rows(4, data[4:])
+        self.assertTrue(numpy.array_equal(packed.to_array(), data))
+
+
+if __name__ == '__main__':
+    unittest.main()
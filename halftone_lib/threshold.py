@@ -0,0 +1,126 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import math
+
+import numpy
+
+from halftone_lib import bilevel
+
+
+def quantize(data, levels):
+    '''Maps every pixel to an intensity level from 0 to levels-1, spreading
+        the levels evenly between the darkest and the lightest pixel of the
+        image. A pixel gets the highest level whose closed interval
+        [lower, lower + step] contains it.'''
+    data = numpy.asarray(data)
+    mini = data.min()
+    maxi = data.max()
+    step = float(float(maxi-mini)/float(levels))
+    lower = mini + step * numpy.arange(levels)
+    upper = lower + step
+    index = numpy.searchsorted(lower, data, side='right') - 1
+    # the last interval can miss the lightest pixel by a rounding error, the
+    # pixel is then left at level 0
+    return numpy.where(data <= upper[index], index, 0)
+
+
+def bayer_matrix(size):
+    '''Returns the size x size Bayer (dispersed dot) index matrix with values
+        0 .. size*size-1. size must be a power of two.'''
+    if size < 2 or size & (size - 1):
+        raise ValueError('Bayer matrix size must be a power of two, not %r' % size)
+    matrix = numpy.array([[0, 2], [3, 1]])
+    while len(matrix) < size:
+        matrix = numpy.vstack([numpy.hstack([4 * matrix, 4 * matrix + 2]),
+                               numpy.hstack([4 * matrix + 3, 4 * matrix + 1])])
+    return matrix
+
+
+def clustered_matrix(size):
+    '''Returns a size x size clustered dot index matrix with values
+        0 .. size*size-1, the highest index in the centre of the cell, so
+        dots grow outwards from the centre as the image gets darker.'''
+    if size < 2:
+        raise ValueError('Clustered dot matrix size must be at least 2, not %r' % size)
+    centre = (size - 1) / 2.0
+    cells = []
+    for i in range(size):
+        for j in range(size):
+            distance = (i - centre) ** 2 + (j - centre) ** 2
+            angle = math.atan2(i - centre, j - centre)
+            cells.append((-distance, angle, i, j))
+    matrix = numpy.zeros((size, size), dtype=int)
+    for rank, (_, _, i, j) in enumerate(sorted(cells)):
+        matrix[i, j] = rank
+    return matrix
+
+
+class ThresholdMap(object):
+    '''An ordered dither threshold matrix. matrix holds the thresholds
+        1 .. N for its N cells; the image is quantized to N+1 levels and a
+        pixel becomes white when its level is above the threshold of the
+        matrix cell it falls on.'''
+
+    def __init__(self, name, matrix):
+        self.name = name
+        self.matrix = numpy.asarray(matrix)
+        self.levels = self.matrix.size + 1
+        self._tiles = {}
+
+    def tiled(self, shape):
+        '''Returns the matrix repeated over an array of the given shape.'''
+        if shape not in self._tiles:
+            rows, cols = self.matrix.shape
+            reps = (-(-shape[0] // rows), -(-shape[1] // cols))
+            self._tiles[shape] = numpy.tile(self.matrix, reps)[:shape[0], :shape[1]]
+        return self._tiles[shape]
+
+    def dither(self, data):
+        '''Returns the ordered dither of a 2-D array as uint8 0/255.'''
+        data = numpy.asarray(data)
+        levels = quantize(data, self.levels)
+        return numpy.where(levels > self.tiled(data.shape), 255, 0).astype(numpy.uint8)
+
+    def dither_bilevel(self, data):
+        '''Same as dither, packed into a 1 bit per pixel bilevel.Bilevel.'''
+        data = numpy.asarray(data)
+        levels = quantize(data, self.levels)
+        return bilevel.Bilevel.from_array(levels > self.tiled(data.shape))
+
+
+# the 3x3 matrix the ordered dithering extensions always used
+CLASSIC = ThresholdMap('classic', [[8, 3, 4], [6, 1, 2], [7, 5, 9]])
+
+_MAPS = {('classic', 3): CLASSIC}
+
+
+def get_map(name='classic', size=3):
+    '''Returns the (cached) threshold map of the given kind and size:
+        'classic' (3x3 only), 'bayer' (size a power of two) or 'clustered'.'''
+    key = (name, size)
+    if name == 'classic':
+        key = ('classic', 3)
+    if key not in _MAPS:
+        if name == 'bayer':
+            matrix = bayer_matrix(size)
+        elif name == 'clustered':
+            matrix = clustered_matrix(size)
+        else:
+            raise KeyError('Unknown threshold map %r, choose classic, bayer '
+                           'or clustered' % name)
+        _MAPS[key] = ThresholdMap('%s-%d' % (name, size), matrix + 1)
+    return _MAPS[key]
@@ -0,0 +1,186 @@
+"""Copyright (c) 2017 abhishek-sehgal954
+    
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; either version 2 of the License, or
+    (at your option) any later version.
+    
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+    """
+import multiprocessing
+import time
+
+import numpy
+
+from halftone_lib import diffusion, kernels
+
+
+def _op(values, clamp):
+    if clamp:
+        return diffusion.clip_trunc(values)
+    return values
+
+
+def _wait(progress, row, need, abort):
+    while progress[row] < need:
+        if abort.value:
+            raise RuntimeError('another wavefront worker failed')
+        time.sleep(0)
+
+
+def _diffuse_rows(first, step, shared, shape, kernel, clamp, chunk):
+    # Worker body: diffuses rows first, first+step, ... Instead of pushing
+    # error into later rows, every chunk of a row pulls the error of the rows
+    # above it as soon as they are far enough ahead, adding the taps in the
+    # order the serial engines push them so the result is bit-identical.
+    data_buf, err_buf, out_buf, progress, abort = shared
+    height, width = shape
+    reach = kernel.reach
+    padded = width + 2 * reach
+    data = numpy.frombuffer(data_buf, dtype=numpy.float64).reshape(height, width)
+    err = numpy.frombuffer(err_buf, dtype=numpy.float64).reshape(height, padded)
+    out = numpy.frombuffer(out_buf, dtype=numpy.float64).reshape(height, width)
+    if clamp:
+        last = height - kernel.depth
+        low, high = reach, width - reach
+    else:
+        last = height
+        low, high = 0, width
+    for y in range(first, height, step):
+        data_row = data[y].tolist()
+        pending = []
+        for x0 in range(0, width, chunk):
+            x1 = min(width, x0 + chunk)
+            if clamp:
+                acc = data[y, x0:x1].copy()
+            else:
+                acc = numpy.zeros(x1 - x0)
+            for dy, taps in reversed(kernel.below):
+                source = y - dy
+                if source < 0 or source >= last:
+                    continue
+                _wait(progress, source, min(width, x1 + reach), abort)
+                for dx, weight in taps:
+                    above = err[source, reach+x0-dx:reach+x1-dx]
+                    acc = _op(acc + weight * above, clamp)
+            acc = acc.tolist()
+            for target, weight, diffused_error in pending:
+                value = acc[target-x0] + weight * diffused_error
+                if clamp:
+                    value = int(value)
+                    value = 0 if value < 0 else (255 if value > 255 else value)
+                acc[target-x0] = value
+            pending = []
+            row_err = [0.0] * (x1 - x0)
+            if y < last:
+                for x in range(max(x0, low), min(x1, high)):
+                    value = acc[x-x0]
+                    if not clamp:
+                        value = data_row[x] + value
+                    new = 255 if value >= 128 else 0
+                    acc[x-x0] = new
+                    diffused_error = value - new
+                    row_err[x-x0] = diffused_error
+                    for dx, weight in kernel.forward:
+                        target = x + dx
+                        if target >= x1:
+                            if target < width:
+                                pending.append((target, weight, diffused_error))
+                            continue
+                        value = acc[target-x0] + weight * diffused_error
+                        if clamp:
+                            value = int(value)
+                            value = 0 if value < 0 else (255 if value > 255 else value)
+                        acc[target-x0] = value
+            out[y, x0:x1] = acc
+            err[y, reach+x0:reach+x1] = row_err
+            progress[y] = x1
+
+
+def _worker(first, step, shared, shape, kernel, clamp, chunk):
+    try:
+        _diffuse_rows(first, step, shared, shape, kernel, clamp, chunk)
+    except Exception:
+        shared[-1].value = 1
+        raise
+
+
+def wavefront_diffuse(data, kernel=kernels.FLOYD_STEINBERG, workers=None,
+                      clamp=False, chunk=128):
+    '''Error diffusion spread over a pool of worker processes. Row y is
+        handled by worker y % workers and starts a chunk of columns as soon
+        as the rows above it are a kernel reach past the end of that chunk,
+        so the rows run as anti-diagonal wavefronts. With clamp it gives the
+        same output as diffusion.scanline_diffuse, without it the same as
+        diffusion.error_diffuse.'''
+    data = numpy.asarray(data, dtype=numpy.float64)
+    height, width = data.shape
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = max(1, min(workers, height))
+    padded = width + 2 * kernel.reach
+    data_buf = multiprocessing.RawArray('d', height * width)
+    numpy.frombuffer(data_buf, dtype=numpy.float64)[:] = data.ravel()
+    err_buf = multiprocessing.RawArray('d', height * padded)
+    out_buf = multiprocessing.RawArray('d', height * width)
+    progress = multiprocessing.RawArray('l', height)
+    abort = multiprocessing.RawValue('i', 0)
+    shared = (data_buf, err_buf, out_buf, progress, abort)
+    pool = [multiprocessing.Process(target=_worker,
+                                    args=(first, workers, shared, (height, width),
+                                          kernel, clamp, chunk))
+            for first in range(workers)]
+    for process in pool:
+        process.start()
+    for process in pool:
+        process.join()
+    if abort.value or any(process.exitcode for process in pool):
+        raise RuntimeError('wavefront error diffusion failed')
+    out = numpy.frombuffer(out_buf, dtype=numpy.float64).reshape(height, width)
+    return out.astype(numpy.uint8)
+
+
+def compare_with_serial(data, kernel=kernels.FLOYD_STEINBERG, workers=None,
+                        clamp=False):
+    '''Runs the serial engine and the wavefront engine on the same data.
+        Returns (result, serial seconds, parallel seconds); raises if the two
+        results differ.'''
+    start = time.time()
+    if clamp:
+        serial = diffusion.scanline_diffuse(data, kernel)
+    else:
+        serial = diffusion.error_diffuse(data, kernel)
+    serial_time = time.time() - start
+    start = time.time()
+    parallel = wavefront_diffuse(data, kernel, workers, clamp)
+    parallel_time = time.time() - start
+    if not numpy.array_equal(serial, parallel):
+        raise RuntimeError('wavefront result differs from the serial engine')
+    return parallel, serial_time, parallel_time
+
+
+def diffuse(data, kernel=kernels.FLOYD_STEINBERG, workers=1, clamp=False,
+            report=None):
+    '''Uses the serial engine for one worker and the wavefront engine for
+        more. If report is given the wavefront engine is also timed against
+        the serial one and report is called with a one line summary.'''
+    if report is not None:
+        result, serial_time, parallel_time = compare_with_serial(
+            data, kernel, workers, clamp)
+        report('Wavefront diffusion (%s, %d workers): %.2fs, serial: %.2fs, '
+               'speedup %.2fx' % (kernel.name, workers or multiprocessing.cpu_count(),
+                                  parallel_time, serial_time,
+                                  serial_time / max(parallel_time, 1e-9)))
+        return result
+    if workers == 1:
+        if clamp:
+            return diffusion.scanline_diffuse(data, kernel)
+        return diffusion.error_diffuse(data, kernel)
+    return wavefront_diffuse(data, kernel, workers, clamp)